@@ -5,41 +5,42 @@ AI Grading Wrapper - Handles import issues for AI grading functionality
 
 import sys
 import os
-from pathlib import Path
+import itertools
 
-def run_ai_grading(notebook_directory, assignment_id, output_csv):
+def run_ai_grading(notebook_directory, assignment_id, output_csv, max_workers=8):
     """
-    Run AI grading with proper import handling
+    Run AI grading with proper import handling, grading up to max_workers notebooks at once
     """
+    from pathlib import Path
+    
     # Add project root to path (not src/)
     project_root = Path(__file__).resolve().parent
     sys.path.insert(0, str(project_root))
     
     try:
-        # Import specific modules directly to avoid circular imports from __init__.py files
+        # Import specific modules directly to avoid circular imports from __init__.py files.
+        # Each stage imports only what it needs so failures exit before the heavier modules load.
         import src.config.config_manager as config_mod
-        import src.ai_grading.ai_grading_agent as ai_mod
-        import src.reports.report_generator as report_mod
-        
-        ConfigManager = config_mod.ConfigManager
-        LLMFactory = config_mod.LLMFactory
-        AIGradingAgent = ai_mod.AIGradingAgent
-        ReportGenerator = report_mod.ReportGenerator
-        create_combined_report = report_mod.create_combined_report
         
         print("🤖 Loading AI grading configuration...")
         
         # Load configuration
-        config = ConfigManager()
-        llm = LLMFactory.create_llm(config)
+        config = config_mod.ConfigManager()
+        llm = config_mod.LLMFactory.create_llm(config)
         print(f"✅ Using LLM: {llm.get_model_name()}")
         
+        # Serve repeated prompts from the on-disk response cache
+        import src.ai_grading.llm_interface as llm_mod
+        if os.environ.get('AI_GRADER_NO_CACHE') != '1' and not isinstance(llm, llm_mod.MockLLM):
+            llm = llm_mod.CachedLLM(llm)
+        
         # Create AI grading agent
-        ai_grader = AIGradingAgent(llm)
+        import src.ai_grading.ai_grading_agent as ai_mod
+        ai_grader = ai_mod.AIGradingAgent(llm)
         
         # Grade all notebooks
         print("🧠 Running AI content analysis...")
-        ai_results = ai_grader.grade_directory(notebook_directory, assignment_id)
+        ai_results = ai_grader.grade_directory(notebook_directory, assignment_id, max_workers)
         
         if ai_results:
             # Export AI results
@@ -47,19 +48,19 @@ def run_ai_grading(notebook_directory, assignment_id, output_csv):
             os.makedirs(ai_output_dir, exist_ok=True)
             
             # Create report generator
-            import src.config.data_structures as data_mod
-            GradingResult = data_mod.GradingResult
-            if ai_results and isinstance(list(ai_results.values())[0], list):
-                all_results = []
-                for student_results in ai_results.values():
-                    if isinstance(student_results, list):
-                        all_results.extend(student_results)
+            import src.reports.report_generator as report_mod
+            first_results = next(iter(ai_results.values()), None)
+            if isinstance(first_results, list):
+                all_results = list(itertools.chain.from_iterable(
+                    student_results for student_results in ai_results.values()
+                    if isinstance(student_results, list)
+                ))
                 
-                report_gen = ReportGenerator(all_results)
+                report_gen = report_mod.ReportGenerator(all_results)
                 report_gen.export_results(ai_output_dir)
             
             # Create combined report
-            create_combined_report(notebook_directory, output_csv, ai_results, assignment_id, "homework")
+            report_mod.create_combined_report(notebook_directory, output_csv, ai_results, assignment_id, "homework")
             
             print(f"✅ AI analysis completed successfully!")
             print(f"📊 AI results saved to: {ai_output_dir}")
@@ -76,9 +77,10 @@ def run_ai_grading(notebook_directory, assignment_id, output_csv):
         return False
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python ai_grading_wrapper.py <notebook_directory> <assignment_id> <output_csv>")
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python ai_grading_wrapper.py <notebook_directory> <assignment_id> <output_csv> [concurrency]")
         sys.exit(1)
-        
-    success = run_ai_grading(sys.argv[1], sys.argv[2], sys.argv[3])
+    
+    max_workers = int(sys.argv[4]) if len(sys.argv) == 5 else 8
+    success = run_ai_grading(sys.argv[1], sys.argv[2], sys.argv[3], max_workers)
     sys.exit(0 if success else 1)
\ No newline at end of file
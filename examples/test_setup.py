@@ -7,8 +7,25 @@ This script verifies that the toy example is properly set up and ready to run.
 
 import os
 import sys
+import importlib.util
 from pathlib import Path
 
+def scan_directory(directory) -> dict:
+    """Return {name: os.DirEntry} for a directory, or an empty dict if it is missing"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name: entry for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+
+def path_exists(base_dir, relative_path: str, scans: dict) -> bool:
+    """Check a relative path using one cached scandir per parent directory"""
+    parent, _, name = relative_path.rpartition('/')
+    directory = os.path.join(base_dir, parent) if parent else str(base_dir)
+    if directory not in scans:
+        scans[directory] = scan_directory(directory)
+    return name in scans[directory]
+
 def check_examples_structure():
     """Check if the examples directory structure is correct"""
     print("🔍 Checking Examples Structure...")
@@ -27,11 +44,14 @@ def check_examples_structure():
         "expected_output"
     ]
     
+    # One directory listing per directory instead of one stat() per path
+    entries = scan_directory(base_dir)
+    scans = {str(base_dir): entries}
+    
     # Check for at least some notebooks (flexible - any notebooks are fine)
     notebooks_dir = base_dir / "notebooks"
-    existing_notebooks = []
-    if notebooks_dir.exists():
-        existing_notebooks = list(notebooks_dir.glob("*.ipynb"))
+    scans[str(notebooks_dir)] = scan_directory(notebooks_dir)
+    existing_notebooks = [name for name in scans[str(notebooks_dir)] if name.endswith(".ipynb")]
     
     required_rubrics = [
         "rubrics/toy_data_analysis.yaml"
@@ -41,8 +61,7 @@ def check_examples_structure():
     
     # Check directories
     for dir_name in required_dirs:
-        dir_path = base_dir / dir_name
-        if dir_path.exists():
+        if dir_name in entries and entries[dir_name].is_dir():
             print(f"✅ Directory: examples/toy_example/{dir_name}")
         else:
             print(f"❌ Missing directory: examples/toy_example/{dir_name}")
@@ -50,8 +69,7 @@ def check_examples_structure():
     
     # Check files
     for file_name in required_files:
-        file_path = base_dir / file_name
-        if file_path.exists():
+        if file_name in entries:
             print(f"✅ File: examples/toy_example/{file_name}")
         else:
             print(f"❌ Missing file: examples/toy_example/{file_name}")
@@ -61,15 +79,14 @@ def check_examples_structure():
     if existing_notebooks:
         print(f"✅ Found {len(existing_notebooks)} notebook(s):")
         for notebook in existing_notebooks:
-            print(f"  📓 {notebook.name}")
+            print(f"  📓 {notebook}")
     else:
         print("⚠️  No notebooks found in examples/toy_example/notebooks/")
         print("   This is optional - you can still test with simple_demo.py")
     
     # Check rubrics
     for rubric in required_rubrics:
-        rubric_path = base_dir / rubric
-        if rubric_path.exists():
+        if path_exists(base_dir, rubric, scans):
             print(f"✅ Rubric: examples/toy_example/{rubric}")
         else:
             print(f"❌ Missing rubric: examples/toy_example/{rubric}")
@@ -102,11 +119,11 @@ def check_modular_system():
     ]
     
     all_good = True
+    scans = {}
     
     # Check required root files
     for file_name in required_files:
-        file_path = Path(file_name)
-        if file_path.exists():
+        if path_exists(".", file_name, scans):
             print(f"✅ File: {file_name}")
         else:
             print(f"❌ Missing file: {file_name}")
@@ -114,16 +131,14 @@ def check_modular_system():
     
     # Check optional files (informational only)
     for file_name in optional_files:
-        file_path = Path(file_name)
-        if file_path.exists():
+        if path_exists(".", file_name, scans):
             print(f"✅ Optional file: {file_name}")
         else:
             print(f"ℹ️  Optional file not present: {file_name} (this is fine)")
     
     # Check src files
     for file_name in required_src_files:
-        file_path = Path(file_name)
-        if file_path.exists():
+        if path_exists(".", file_name, scans):
             print(f"✅ Src file: {file_name}")
         else:
             print(f"❌ Missing src file: {file_name}")
@@ -147,10 +162,10 @@ def check_dependencies():
     all_good = True
     
     for package in required_packages:
-        try:
-            __import__(package)
+        # find_spec locates the package without executing its __init__
+        if importlib.util.find_spec(package) is not None:
             print(f"✅ Package: {package}")
-        except ImportError:
+        else:
             print(f"❌ Missing package: {package}")
             all_good = False
     
@@ -171,13 +186,14 @@ def check_src_structure():
     
     all_good = True
     
-    if not src_dir.exists():
+    entries = scan_directory(src_dir)
+    if not entries:
         print("❌ Missing src directory")
         return False
     
+    scans = {str(src_dir): entries}
     for package in required_packages:
-        package_path = src_dir / package
-        if package_path.exists() and (package_path / "__init__.py").exists():
+        if package in entries and path_exists(src_dir, f"{package}/__init__.py", scans):
             print(f"✅ Package: {package}")
         else:
             print(f"❌ Missing package: {package}")
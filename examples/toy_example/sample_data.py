@@ -7,6 +7,17 @@ import pandas as pd
 import numpy as np
 import os
 
+# Compact dtypes for the sample columns (ranges are small, demo data needs no float64 precision).
+# Pass as dtype= when reading student_data.csv back to keep the same footprint.
+SAMPLE_DATA_DTYPES = {
+    'student_id': np.int32,
+    'age': np.int8,
+    'study_hours': np.float32,
+    'gpa': np.float32,
+    'attendance': np.int8,
+    'assignment_score': np.float32
+}
+
 def create_sample_dataset():
     """Create a sample dataset for testing"""
     
@@ -34,12 +45,13 @@ def create_sample_dataset():
     data['gpa'] = data['gpa'] + (data['study_hours'] - 15) * 0.02
     data['assignment_score'] = data['assignment_score'] + (data['study_hours'] - 15) * 0.5
     
-    # Create DataFrame
-    df = pd.DataFrame(data)
+    # Create DataFrame, downcasting once all arithmetic has been done in float64
+    df = pd.DataFrame(data).astype(SAMPLE_DATA_DTYPES)
     
     # Save to CSV (in current directory since we're already in examples/toy_example/)
     csv_path = 'student_data.csv'
-    df.to_csv(csv_path, index=False)
+    # Always '\n' (not os.linesep) so the file is byte-identical across platforms
+    df.to_csv(csv_path, index=False, lineterminator='\n', chunksize=10_000)
     
     print(f"✅ Created sample dataset: {csv_path}")
     print(f"Dataset shape: {df.shape}")
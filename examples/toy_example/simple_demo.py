@@ -5,8 +5,8 @@ Simple working demo of the toy example focusing on anonymization
 
 import os
 import sys
+import numpy as np
 import pandas as pd
-from pathlib import Path
 
 # Add src/utils to path for direct import
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,7 +15,7 @@ sys.path.insert(0, utils_dir)
 
 from student_id_manager import StudentIDManager
 
-def main():
+def main(verify=False):
     """Simple demonstration that works with the current setup"""
     print("🎯 Simple Toy Example Demo")
     print("=" * 50)
@@ -28,7 +28,11 @@ def main():
     
     # Step 2: Simulate student notebooks
     print("\n2️⃣ Simulating student notebooks...")
-    notebook_files = list(Path("notebooks").glob("*.ipynb"))
+    notebook_files = []
+    if os.path.isdir("notebooks"):
+        with os.scandir("notebooks") as entries:
+            notebook_files = [e.name for e in entries
+                              if e.name.endswith(".ipynb") and e.is_file(follow_symlinks=False)]
     
     if not notebook_files:
         print("⚠️  No notebook files found. Creating simulation...")
@@ -37,8 +41,6 @@ def main():
             "Student_B_Incomplete_Answers.ipynb", 
             "Student_C_No_Answers.ipynb"
         ]
-    else:
-        notebook_files = [f.name for f in notebook_files]
     
     print(f"📚 Found {len(notebook_files)} notebooks:")
     for notebook in notebook_files:
@@ -73,25 +75,21 @@ def main():
     # Step 5: Mock grading results
     print("\n5️⃣ Creating mock grading results...")
     
-    # Create a simple results CSV with anonymous IDs
-    results_data = []
-    for student_name, anon_id in student_mappings.items():
-        # Mock some grades
-        if "Good" in student_name:
-            score = 85 + (hash(student_name) % 10)
-        elif "Incomplete" in student_name:
-            score = 65 + (hash(student_name) % 15)
-        else:
-            score = 45 + (hash(student_name) % 20)
-        
-        results_data.append({
-            'Student_ID': anon_id,
-            'Assignment': assignment_id,
-            'Score': score,
-            'Grade': 'A' if score >= 90 else 'B' if score >= 80 else 'C' if score >= 70 else 'D'
-        })
-    
-    results_df = pd.DataFrame(results_data)
+    # Create a simple results CSV with anonymous IDs, mocking all grades in one vectorized pass
+    # Classify every name with one regex pass, then look up (base score, jitter range) per category
+    score_profiles = {"Good": (85, 10), "Incomplete": (65, 15), "Other": (45, 20)}
+    names = pd.Series(list(student_mappings), dtype=object)
+    category = names.str.extract(r"(Good|Incomplete)", expand=False).fillna("Other")
+    base_scores = category.map({k: v[0] for k, v in score_profiles.items()}).to_numpy(np.int64)
+    jitter_range = category.map({k: v[1] for k, v in score_profiles.items()}).to_numpy(np.uint64)
+    scores = base_scores + (pd.util.hash_array(names.to_numpy()) % jitter_range).astype(np.int64)
+    
+    results_df = pd.DataFrame({
+        'Student_ID': list(student_mappings.values()),
+        'Assignment': assignment_id,
+        'Score': scores,
+        'Grade': pd.cut(scores, bins=[-np.inf, 70, 80, 90, np.inf], right=False, labels=list("DCBA"))
+    })
     results_file = "anonymous_results.csv"
     results_df.to_csv(results_file, index=False)
     
@@ -102,12 +100,17 @@ def main():
     # Step 6: Demonstrate name revelation
     print("\n6️⃣ Demonstrating name revelation...")
     
-    # Load mapping and reveal names
-    id_manager_reveal = StudentIDManager("temp_mappings")
-    success = id_manager_reveal.load_mapping(assignment_id, password)
+    # id_manager still holds the plaintext mapping; only re-decrypt from disk when verifying the round-trip
+    if verify:
+        id_manager_reveal = StudentIDManager("temp_mappings")
+        success = id_manager_reveal.load_mapping(assignment_id, password)
+    else:
+        id_manager_reveal = id_manager
+        success = True
     
     if success:
-        print("✅ Mapping loaded successfully")
+        if verify:
+            print("✅ Mapping loaded successfully")
         print("\n🔓 Results with real names:")
         
         for _, row in results_df.iterrows():
@@ -116,26 +119,32 @@ def main():
             print(f"  {real_name:<30} → {row['Score']} ({row['Grade']})")
     
     # Step 7: Summary
-    print("\n7️⃣ Summary")
-    print("=" * 50)
-    print("✅ Completed workflow:")
-    print("  1. Generated sample data")
-    print("  2. Identified student notebooks") 
-    print("  3. Created anonymous IDs")
-    print("  4. Saved secure mappings")
-    print("  5. Generated anonymous results")
-    print("  6. Revealed real names")
-    
-    print(f"\n📁 Files created:")
-    print(f"  • student_data.csv - Sample dataset")
-    print(f"  • {results_file} - Anonymous grading results")
-    print(f"  • {os.path.basename(mapping_file)} - Encrypted mappings")
-    print(f"  • {os.path.basename(roster_file)} - Anonymous roster")
-    
-    print("\n🚀 Next steps:")
-    print("  • Use the CLI tool: python ../../src/utils/student_id_cli.py")
-    print("  • Try real grading with the main system")
-    print("  • Set up API keys in .env for real LLM grading")
+    print(f"""
+7️⃣ Summary
+{"=" * 50}
+✅ Completed workflow:
+  1. Generated sample data
+  2. Identified student notebooks
+  3. Created anonymous IDs
+  4. Saved secure mappings
+  5. Generated anonymous results
+  6. Revealed real names
+
+📁 Files created:
+  • student_data.csv - Sample dataset
+  • {results_file} - Anonymous grading results
+  • {os.path.basename(mapping_file)} - Encrypted mappings
+  • {os.path.basename(roster_file)} - Anonymous roster
+
+🚀 Next steps:
+  • Use the CLI tool: python ../../src/utils/student_id_cli.py
+  • Try real grading with the main system
+  • Set up API keys in .env for real LLM grading""")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Simple anonymization demo for the toy example")
+    parser.add_argument('--verify', action='store_true',
+                        help='Reload the encrypted mapping from disk to verify the save/load round-trip')
+    args = parser.parse_args()
+    main(verify=args.verify)
@@ -9,17 +9,11 @@ import os
 import argparse
 from pathlib import Path
 
-# Add src directory to Python path
+# Add src/core to Python path for the flat `notebook_grader` import used in ICA mode.
+# Homework mode goes through ai_grading_wrapper, which sets up its own package imports.
 current_dir = os.path.dirname(os.path.abspath(__file__))
 src_dir = os.path.join(current_dir, 'src')
-sys.path.insert(0, src_dir)
-
-# Add individual module directories to avoid relative import issues
 sys.path.insert(0, os.path.join(src_dir, 'core'))
-sys.path.insert(0, os.path.join(src_dir, 'config'))
-sys.path.insert(0, os.path.join(src_dir, 'ai_grading'))
-sys.path.insert(0, os.path.join(src_dir, 'reports'))
-sys.path.insert(0, os.path.join(src_dir, 'utils'))
 
 def main():
     """Main grading function that works around import issues"""
@@ -29,6 +23,8 @@ def main():
     parser.add_argument('--mode', choices=['ica', 'homework'], default='homework', 
                         help='Grading mode: "ica" for completion-only, "homework" for rubric-based (default: homework)')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--concurrency', '-j', type=int, default=8,
+                        help='Number of notebooks to grade concurrently in homework mode (default: 8)')
     
     args = parser.parse_args()
     
@@ -42,13 +38,15 @@ def main():
     
     # Check if notebook directory exists
     notebook_path = Path(args.notebook_dir)
-    if not notebook_path.exists():
+    if not notebook_path.is_dir():
         print(f"❌ Directory not found: {args.notebook_dir}")
         print("💡 Make sure the path is correct and run from project root")
         return 1
     
     # Find notebooks
-    notebooks = list(notebook_path.glob("*.ipynb"))
+    with os.scandir(notebook_path) as entries:
+        notebooks = [e.name for e in entries
+                     if e.name.endswith(".ipynb") and e.is_file(follow_symlinks=False)]
     if not notebooks:
         print(f"❌ No notebooks found in: {args.notebook_dir}")
         print("💡 Make sure the directory contains .ipynb files")
@@ -56,7 +54,7 @@ def main():
     
     print(f"📓 Found {len(notebooks)} notebook(s):")
     for nb in notebooks:
-        print(f"  • {nb.name}")
+        print(f"  • {nb}")
     print()
     
     # Check for rubric (only required for homework mode)
@@ -92,20 +90,11 @@ def main():
             # Run AI grading only
             print("🤖 Running AI content analysis...")
             try:
-                import subprocess
-                result = subprocess.run([
-                    sys.executable, 
-                    'ai_grading_wrapper.py', 
-                    str(notebook_path), 
-                    args.assignment_id, 
-                    output_csv
-                ], capture_output=True, text=True, cwd=os.getcwd())
-                
-                print(result.stdout)
-                if result.stderr:
-                    print("Warnings:", result.stderr)
+                # Run in-process: no second interpreter start-up or stdout pipe to drain
+                from ai_grading_wrapper import run_ai_grading
+                success = run_ai_grading(str(notebook_path), args.assignment_id, output_csv, args.concurrency)
                 
-                if result.returncode == 0:
+                if success:
                     print("✅ AI grading completed successfully!")
                 else:
                     print("❌ AI grading failed. No grades generated.")
@@ -6,11 +6,19 @@ Multi-Run AI Grader - Grades notebooks multiple times with different models
 import sys
 import os
 import yaml
+import numpy as np
 import csv
-import statistics
+import contextvars
+import hashlib
+import json
+import re
+import math
+from collections import defaultdict
+from dataclasses import asdict
 from pathlib import Path
 from typing import Dict, List, Any
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables from .env file
 try:
@@ -21,6 +29,70 @@ except ImportError:
     print("Warning: python-dotenv not installed. Environment variables from .env won't be loaded.")
     print("Install with: pip install python-dotenv")
 
+# Add project root to path (once) for the `src.*` package imports
+_PROJECT_ROOT = str(Path(__file__).resolve().parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+# Prefer the libyaml-backed loader; fall back to the pure-Python one
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+if _YAML_LOADER is yaml.SafeLoader:
+    print("Warning: PyYAML was built without libyaml. Config parsing will be slower.")
+
+class ConcurrentRunOutput:
+    """sys.stdout stand-in while runs grade concurrently.
+    
+    Output written inside capture(), including from worker threads started in that context, is
+    buffered line by line and printed as one block when the run ends, so each run's report stays
+    readable; output from anywhere else passes straight through, one whole line at a time.
+    """
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._buffer = contextvars.ContextVar('run_output_buffer', default=None)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def capture(self):
+        """Start buffering output in the current context; returns a token for release()"""
+        return self._buffer.set([])
+    
+    def release(self, token):
+        """Stop buffering and print what was buffered in one piece"""
+        self.flush()
+        lines = self._buffer.get()
+        self._buffer.reset(token)
+        with self._lock:
+            self._stream.write(''.join(lines))
+            self._stream.flush()
+    
+    def _emit(self, text: str):
+        lines = self._buffer.get()
+        with self._lock:
+            if lines is not None:
+                lines.append(text)
+            else:
+                self._stream.write(text)
+    
+    def write(self, text: str) -> int:
+        # print() writes the text and the newline separately; hold partial lines until they end
+        head, newline, tail = (getattr(self._local, 'partial', '') + text).rpartition('\n')
+        if newline:
+            self._emit(head + newline)
+        self._local.partial = tail
+        return len(text)
+    
+    def flush(self):
+        partial = getattr(self._local, 'partial', '')
+        if partial:
+            self._local.partial = ''
+            self._emit(partial)
+        with self._lock:
+            self._stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
 def load_multi_run_config(config_path: str = "config/multi_run_config.yaml") -> Dict:
     """Load multi-run configuration"""
     if not os.path.exists(config_path):
@@ -29,52 +101,195 @@ def load_multi_run_config(config_path: str = "config/multi_run_config.yaml") ->
         sys.exit(1)
     
     with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+# LLM clients by (provider, model, temperature), so runs with identical settings share one
+# client and its HTTP connection pool instead of each building their own
+_LLM_CACHE = {}
+_LLM_CACHE_LOCK = threading.Lock()
+
+def get_run_llm(run_config: Dict, config_mod):
+    """Return the LLM client for a run's settings, creating it on first use"""
+    
+    key = (run_config['provider'], run_config['model'], run_config['temperature'])
+    
+    with _LLM_CACHE_LOCK:
+        if key not in _LLM_CACHE:
+            # Create temporary config for this run
+            temp_config = {
+                'llm_settings': {
+                    'provider': run_config['provider'],
+                    'model': run_config['model'],
+                    'temperature': run_config['temperature'],
+                    'max_tokens': 1500,
+                    'api_key': ''  # Will use .env
+                },
+                'grading_settings': {
+                    'confidence_threshold': 0.7,
+                    'auto_flag_low_confidence': True,
+                    'enable_detailed_feedback': True
+                }
+            }
+            
+            # Override the config manager's config
+            config_manager = config_mod.ConfigManager()
+            config_manager.config = temp_config
+            
+            _LLM_CACHE[key] = config_mod.LLMFactory.create_llm(config_manager)
+        
+        return _LLM_CACHE[key]
+
+def notebook_fingerprint(notebook_path: str) -> str:
+    """Content hash of a notebook file (sources and outputs both feed the grading prompt)"""
+    
+    with open(notebook_path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+# Bump when the manifest layout changes
+MANIFEST_VERSION = 1
+
+# Code that builds the grading prompt, parses notebooks or interprets replies; editing any of it
+# changes grades, so its content is part of the manifest settings
+_GRADING_CODE_FILES = (
+    os.path.join('src', 'ai_grading', 'llm_grader.py'),
+    os.path.join('src', 'ai_grading', 'ai_grading_agent.py'),
+    os.path.join('src', 'core', 'notebook_parser.py'),
+    os.path.join('src', 'core', 'notebook_io.py'),
+)
+
+def grading_code_version() -> str:
+    """Content hash of the grading prompt, parser and grader code"""
+    
+    signature = hashlib.blake2b(digest_size=16)
+    for relative_path in _GRADING_CODE_FILES:
+        with open(os.path.join(_PROJECT_ROOT, relative_path), 'rb') as f:
+            signature.update(f.read())
+    return signature.hexdigest()
 
-def run_single_grading(notebook_dir: str, assignment_id: str, run_config: Dict, run_name: str) -> Dict:
-    """Run grading with a specific model configuration"""
+def grade_changed_notebooks(ai_grader, notebook_dir: str, assignment_id: str, run_config: Dict,
+                            run_name: str, max_workers: int = 8, batch_size: int = 1,
+                            max_batch_tokens: int = 6000) -> Dict:
+    """Grade only notebooks whose content, rubric or run settings changed since the last run.
+    
+    Per-notebook results are kept in a JSON manifest in the run's output directory.
+    Set AI_GRADER_NO_CACHE=1 to always regrade everything.
+    """
+    
+    if os.environ.get('AI_GRADER_NO_CACHE') == '1' or not os.path.isdir(notebook_dir):
+        return ai_grader.grade_directory(notebook_dir, assignment_id, max_workers)
+    
+    manifest_path = os.path.join(notebook_dir, 'multi_run_results', run_name.replace(" ", "_"),
+                                 '.cache', 'manifest.json')
+    
+    # Anything that changes every notebook's grade invalidates the whole manifest
+    rubric_path = os.path.join("rubrics", f"{assignment_id}.txt")
+    rubric_stat = os.stat(rubric_path) if os.path.exists(rubric_path) else None
+    settings = {
+        'manifest_version': MANIFEST_VERSION,
+        'grading_code': grading_code_version(),
+        'assignment_id': assignment_id,
+        'provider': run_config['provider'],
+        'model': run_config['model'],
+        'temperature': run_config['temperature'],
+        'batch_size': batch_size,
+        'max_batch_tokens': max_batch_tokens,
+        'rubric': rubric_stat and [rubric_stat.st_mtime_ns, rubric_stat.st_size]
+    }
+    
+    from src.config.data_structures import GradingResult
+    
+    manifest = {}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('settings') == settings:
+                manifest = {
+                    f: (fingerprint, [GradingResult(**fields) for fields in results])
+                    for f, (fingerprint, results) in cached['notebooks'].items()
+                }
+        except Exception as e:
+            print(f"   ⚠️ Ignoring unreadable results manifest: {e}")
+    
+    with os.scandir(notebook_dir) as entries:
+        notebook_files = sorted(entry.name for entry in entries if entry.name.endswith('.ipynb') and entry.is_file())
+    fingerprints = {f: notebook_fingerprint(os.path.join(notebook_dir, f)) for f in notebook_files}
+    changed = [f for f in notebook_files if manifest.get(f, (None,))[0] != fingerprints[f]]
+    
+    if len(changed) < len(notebook_files):
+        print(f"   ♻️  Reusing cached results for {len(notebook_files) - len(changed)} unchanged notebook(s)")
+    
+    graded = ai_grader.grade_directory(notebook_dir, assignment_id, max_workers, changed) if changed else {}
+    
+    ai_results = {}
+    for f in notebook_files:
+        if f in graded:
+            ai_results[f] = graded[f]
+        elif f not in changed:
+            ai_results[f] = manifest[f][1]
+    
+    # Only keep successful gradings so failed notebooks are retried next time
+    new_manifest = {
+        f: [fingerprints[f], [asdict(result) for result in results]]
+        for f, results in ai_results.items() if results
+    }
+    # Write atomically so an interrupted or concurrent run never leaves a truncated manifest; a failed
+    # write only costs the reuse next time, so warn instead of failing a run whose grading is done
+    temp_path = f"{manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'settings': settings, 'notebooks': new_manifest}, f)
+        os.replace(temp_path, manifest_path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"   ⚠️ Could not save results manifest: {e}")
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+    
+    return ai_results
+
+def run_grading_buffered(output: ConcurrentRunOutput, *args) -> Dict:
+    """run_single_grading with the run's own output printed as one block when it finishes"""
+    
+    token = output.capture()
+    try:
+        return run_single_grading(*args)
+    finally:
+        output.release(token)
+
+def run_single_grading(notebook_dir: str, assignment_id: str, run_config: Dict, run_name: str,
+                       max_workers: int = 8, batch_size: int = 1, max_batch_tokens: int = 6000) -> Dict:
+    """Run grading with a specific model configuration, grading up to max_workers notebooks concurrently"""
     
     print(f"\n🤖 Running: {run_name}")
     print(f"   Model: {run_config['provider']}/{run_config['model']}")
     print(f"   Temperature: {run_config['temperature']}")
     
-    # Add project root to path for imports
-    project_root = Path(__file__).resolve().parent
-    sys.path.insert(0, str(project_root))
-    
     try:
         # Import the grading modules
         import src.config.config_manager as config_mod
         import src.ai_grading.ai_grading_agent as ai_mod
+        import src.ai_grading.llm_interface as llm_mod
         import src.reports.report_generator as report_mod
         
-        # Create temporary config for this run
-        temp_config = {
-            'llm_settings': {
-                'provider': run_config['provider'],
-                'model': run_config['model'],
-                'temperature': run_config['temperature'],
-                'max_tokens': 1500,
-                'api_key': ''  # Will use .env
-            },
-            'grading_settings': {
-                'confidence_threshold': 0.7,
-                'auto_flag_low_confidence': True,
-                'enable_detailed_feedback': True
-            }
-        }
+        # Create LLM (shared with any other run using the same settings) and grading agent
+        llm = get_run_llm(run_config, config_mod)
         
-        # Override the config manager's config
-        config_manager = config_mod.ConfigManager()
-        config_manager.config = temp_config
+        # Share the on-disk response cache across runs and re-runs; temperature is part of the key
+        # so runs of the same model at different temperatures stay independent
+        if os.environ.get('AI_GRADER_NO_CACHE') != '1' and not isinstance(llm, llm_mod.MockLLM):
+            llm = llm_mod.CachedLLM(
+                llm, key_prefix=f"{run_config['provider']}|temperature={run_config['temperature']}"
+            )
         
-        # Create LLM and grading agent
-        llm = config_mod.LLMFactory.create_llm(config_manager)
-        ai_grader = ai_mod.AIGradingAgent(llm)
+        ai_grader = ai_mod.AIGradingAgent(llm, batch_size=batch_size, max_batch_tokens=max_batch_tokens)
         
-        # Run the grading
+        # Run the grading, reusing results for notebooks unchanged since this run's last grading
         print("   🧠 Running AI analysis...")
-        ai_results = ai_grader.grade_directory(notebook_dir, assignment_id)
+        ai_results = grade_changed_notebooks(ai_grader, notebook_dir, assignment_id, run_config,
+                                             run_name, max_workers, batch_size, max_batch_tokens)
         
         if not ai_results:
             print(f"   ❌ No results from {run_name}")
@@ -108,6 +323,23 @@ def run_single_grading(notebook_dir: str, assignment_id: str, run_config: Dict,
         print(f"   ❌ Error in {run_name}: {e}")
         return {}
 
+# Sentence boundaries in model feedback: whitespace after terminal punctuation, or a line break.
+# Decimals such as "7.5/10" are not boundaries.
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n')
+
+def first_unique(items, limit: int) -> List:
+    """Return up to limit distinct items in first-seen order, stopping as soon as enough are found"""
+    
+    seen = set()
+    unique = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            unique.append(item)
+            if len(unique) >= limit:
+                break
+    return unique
+
 def summarize_feedback(feedbacks: List[str]) -> str:
     """Summarize multiple feedback texts into a single consolidated feedback"""
     
@@ -120,14 +352,13 @@ def summarize_feedback(feedbacks: List[str]) -> str:
     # For now, create a simple summary by combining unique points
     # In a real implementation, you might use an LLM to summarize
     
-    all_points = []
-    for feedback in feedbacks:
-        # Extract key points (simple heuristic)
-        sentences = feedback.replace('.', '.\n').split('\n')
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if len(sentence) > 20 and sentence not in all_points:
-                all_points.append(sentence)
+    # Extract key points (simple heuristic); only the first 4 distinct ones can affect the summary
+    sentences = (
+        sentence.strip()
+        for feedback in feedbacks
+        for sentence in _SENTENCE_BREAK.split(feedback)
+    )
+    all_points = first_unique((sentence for sentence in sentences if len(sentence) > 20), 4)
     
     # Combine into summary
     if len(all_points) <= 3:
@@ -143,72 +374,101 @@ def aggregate_results(run_results: List[Dict], config: Dict) -> Dict:
     
     print("\n📊 Aggregating results from all runs into single final grades...")
     
-    # Group results by student and problem
-    student_problem_data = {}
+    # Group results by student and problem, keeping running (Welford) score statistics
+    # so each result is visited once and no per-key score lists are stored
+    student_problem_data = defaultdict(lambda: {
+        'count': 0,
+        'score_mean': 0.0,
+        'score_m2': 0.0,
+        'confidence_sum': 0.0,
+        'feedbacks': [],
+        'suggestions': []
+    })
     
     for run_data in run_results:
         if not run_data.get('all_results'):
             continue
         
         for result in run_data['all_results']:
-            student_id = result.student_id
-            problem_id = result.problem_id
-            key = f"{student_id}|{problem_id}"
+            data = student_problem_data[(result.student_id, result.problem_id)]
             
-            if key not in student_problem_data:
-                student_problem_data[key] = {
-                    'student_id': student_id,
-                    'problem_id': problem_id,
-                    'scores': [],
-                    'confidences': [],
-                    'feedbacks': [],
-                    'suggestions': [],
-                    'max_possible': result.max_possible
-                }
-            
-            student_problem_data[key]['scores'].append(result.total_score)
-            student_problem_data[key]['confidences'].append(result.confidence)
-            student_problem_data[key]['feedbacks'].append(result.feedback)
-            student_problem_data[key]['suggestions'].extend(result.suggestions)
+            data['count'] += 1
+            delta = result.total_score - data['score_mean']
+            data['score_mean'] += delta / data['count']
+            data['score_m2'] += delta * (result.total_score - data['score_mean'])
+            data['confidence_sum'] += result.confidence
+            data['feedbacks'].append(result.feedback)
+            data['suggestions'].extend(result.suggestions)
+            data.setdefault('max_possible', result.max_possible)
     
     # Create final averaged results
     from src.config.data_structures import GradingResult
     
+    variance_threshold = config.get('aggregation', {}).get('variance_threshold', 15)
+    
     final_results = []
-    for key, data in student_problem_data.items():
-        if len(data['scores']) >= 1:
-            # Calculate averages
-            avg_score = statistics.mean(data['scores'])
-            avg_confidence = statistics.mean(data['confidences'])
-            score_variance = statistics.stdev(data['scores']) if len(data['scores']) > 1 else 0
-            
-            # Merge feedback
-            merged_feedback = summarize_feedback(data['feedbacks'])
-            
-            # Merge suggestions (unique only)
-            unique_suggestions = list(set(data['suggestions']))[:5]  # Limit to 5
-            
-            # Flag high variance
-            high_variance = score_variance > config.get('aggregation', {}).get('variance_threshold', 15)
-            
-            # Create averaged result
-            averaged_result = GradingResult(
-                problem_id=data['problem_id'],
-                student_id=data['student_id'],
-                scores={},  # Individual criterion scores not tracked in multi-run
-                total_score=round(avg_score, 1),
-                max_possible=data['max_possible'],
-                percentage=round((avg_score / data['max_possible']) * 100, 1),
-                feedback=f"{merged_feedback}" + (f" [Score variance: {score_variance:.1f}]" if high_variance else ""),
-                suggestions=unique_suggestions,
-                confidence=round(avg_confidence, 2),
-                flagged_for_review=high_variance or avg_confidence < 0.7
-            )
-            
-            final_results.append(averaged_result)
+    for (student_id, problem_id), data in student_problem_data.items():
+        # Calculate averages
+        count = data['count']
+        avg_score = data['score_mean']
+        avg_confidence = data['confidence_sum'] / count
+        score_variance = math.sqrt(data['score_m2'] / (count - 1)) if count > 1 else 0
+        
+        # Merge feedback
+        merged_feedback = summarize_feedback(data['feedbacks'])
+        
+        # Merge suggestions (unique only)
+        unique_suggestions = first_unique(data['suggestions'], 5)  # Limit to 5
+        
+        # Flag high variance
+        high_variance = score_variance > variance_threshold
+        
+        # Create averaged result
+        averaged_result = GradingResult(
+            problem_id=problem_id,
+            student_id=student_id,
+            scores={},  # Individual criterion scores not tracked in multi-run
+            total_score=round(avg_score, 1),
+            max_possible=data['max_possible'],
+            percentage=round((avg_score / data['max_possible']) * 100, 1),
+            feedback=f"{merged_feedback}" + (f" [Score variance: {score_variance:.1f}]" if high_variance else ""),
+            suggestions=unique_suggestions,
+            confidence=round(avg_confidence, 2),
+            flagged_for_review=high_variance or avg_confidence < 0.7
+        )
+        
+        final_results.append(averaged_result)
     
     return final_results
 
+def _write_feedback_file(detailed_feedback_dir: str, student_id: str, assignment_id: str, results: List):
+    """Write one student's merged multi-run feedback file"""
+    
+    feedback_file = os.path.join(detailed_feedback_dir, f"{student_id}_ai_feedback.txt")
+    
+    # Build the file in memory and write it with a single call
+    parts = [
+        f"AI Grading Feedback - {student_id}\n",
+        "=" * 50 + "\n",
+        f"Assignment: {assignment_id}\n",
+        "Graded using: Multi-model ensemble (5 models averaged)\n\n",
+    ]
+    
+    for result in results:
+        parts.append(f"Problem: {result.problem_id}\n")
+        parts.append(f"Score: {result.total_score}/{result.max_possible} ({result.percentage}%)\n")
+        parts.append(f"Confidence: {result.confidence}\n")
+        parts.append(f"Feedback: {result.feedback}\n")
+        
+        if result.suggestions:
+            parts.append("Suggestions for Improvement:\n")
+            parts.extend(f"  • {suggestion}\n" for suggestion in result.suggestions)
+        
+        parts.append("\n" + "-" * 30 + "\n\n")
+    
+    with open(feedback_file, 'w', encoding='utf-8') as f:
+        f.write("".join(parts))
+
 def create_final_output(final_results: List, notebook_dir: str, assignment_id: str):
     """Create final consolidated output that matches single-run format"""
     
@@ -228,17 +488,15 @@ def create_final_output(final_results: List, notebook_dir: str, assignment_id: s
         fieldnames = ['Student Name', 'Problem ID', 'Total Score', 'Max Possible', 'Percentage', 'Confidence', 'Flagged for Review']
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
-        
-        for result in final_results:
-            writer.writerow({
-                'Student Name': result.student_id,
-                'Problem ID': result.problem_id,
-                'Total Score': result.total_score,
-                'Max Possible': result.max_possible,
-                'Percentage': f"{result.percentage}%",
-                'Confidence': result.confidence,
-                'Flagged for Review': 'Yes' if result.flagged_for_review else 'No'
-            })
+        writer.writerows({
+            'Student Name': result.student_id,
+            'Problem ID': result.problem_id,
+            'Total Score': result.total_score,
+            'Max Possible': result.max_possible,
+            'Percentage': f"{result.percentage}%",
+            'Confidence': result.confidence,
+            'Flagged for Review': 'Yes' if result.flagged_for_review else 'No'
+        } for result in final_results)
     
     # Generate individual feedback files
     detailed_feedback_dir = os.path.join(ai_output_dir, 'detailed_feedback')
@@ -252,62 +510,40 @@ def create_final_output(final_results: List, notebook_dir: str, assignment_id: s
             student_results[student_id] = []
         student_results[student_id].append(result)
     
-    # Create detailed feedback files
-    for student_id, results in student_results.items():
-        feedback_file = os.path.join(detailed_feedback_dir, f"{student_id}_ai_feedback.txt")
+    # Write the detailed feedback files on background threads while the CSV and HTML reports are built
+    with ThreadPoolExecutor(max_workers=8) as feedback_writer:
+        feedback_writes = [
+            feedback_writer.submit(_write_feedback_file, detailed_feedback_dir, student_id, assignment_id, results)
+            for student_id, results in student_results.items()
+        ]
         
-        with open(feedback_file, 'w', encoding='utf-8') as f:
-            f.write(f"AI Grading Feedback - {student_id}\n")
-            f.write("=" * 50 + "\n")
-            f.write(f"Assignment: {assignment_id}\n")
-            f.write(f"Graded using: Multi-model ensemble (5 models averaged)\n\n")
-            
-            for result in results:
-                f.write(f"Problem: {result.problem_id}\n")
-                f.write(f"Score: {result.total_score}/{result.max_possible} ({result.percentage}%)\n")
-                f.write(f"Confidence: {result.confidence}\n")
-                f.write(f"Feedback: {result.feedback}\n")
-                
-                if result.suggestions:
-                    f.write("Suggestions for Improvement:\n")
-                    for suggestion in result.suggestions:
-                        f.write(f"  • {suggestion}\n")
+        try:
+            # Generate flagged for review CSV
+            flagged_results = [r for r in final_results if r.flagged_for_review]
+            if flagged_results:
+                flagged_file = os.path.join(ai_output_dir, 'flagged_for_review.csv')
                 
-                f.write("\n" + "-" * 30 + "\n\n")
-    
-    # Generate flagged for review CSV
-    flagged_results = [r for r in final_results if r.flagged_for_review]
-    if flagged_results:
-        flagged_file = os.path.join(ai_output_dir, 'flagged_for_review.csv')
-        
-        with open(flagged_file, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['Student Name', 'Problem ID', 'Score', 'Confidence', 'Reason', 'Feedback']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
+                with open(flagged_file, 'w', newline='', encoding='utf-8') as f:
+                    fieldnames = ['Student Name', 'Problem ID', 'Score', 'Confidence', 'Reason', 'Feedback']
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer.writeheader()
+                    writer.writerows({
+                        'Student Name': result.student_id,
+                        'Problem ID': result.problem_id,
+                        'Score': f"{result.total_score}/{result.max_possible}",
+                        'Confidence': result.confidence,
+                        'Reason': "High variance between models" if "variance" in result.feedback else "Low confidence",
+                        'Feedback': result.feedback[:100] + "..." if len(result.feedback) > 100 else result.feedback
+                    } for result in flagged_results)
             
-            for result in flagged_results:
-                reason = "High variance between models" if "variance" in result.feedback else "Low confidence"
-                writer.writerow({
-                    'Student Name': result.student_id,
-                    'Problem ID': result.problem_id,
-                    'Score': f"{result.total_score}/{result.max_possible}",
-                    'Confidence': result.confidence,
-                    'Reason': reason,
-                    'Feedback': result.feedback[:100] + "..." if len(result.feedback) > 100 else result.feedback
-                })
-    
-    # Create combined HTML report using standard function
-    # Convert results back to the format expected by create_combined_report
-    ai_results_dict = {}
-    for result in final_results:
-        student_id = result.student_id
-        if student_id not in ai_results_dict:
-            ai_results_dict[student_id] = []
-        ai_results_dict[student_id].append(result)
-    
-    # Generate HTML report
-    output_csv = os.path.join(notebook_dir, "traditional_grades.csv")  # For compatibility
-    report_mod.create_combined_report(notebook_dir, output_csv, ai_results_dict, assignment_id, "homework")
+            # Create combined HTML report using standard function
+            # (student_results is already in the per-student format expected by create_combined_report)
+            output_csv = os.path.join(notebook_dir, "traditional_grades.csv")  # For compatibility
+            report_mod.create_combined_report(notebook_dir, output_csv, student_results, assignment_id, "homework")
+        finally:
+            # Wait for the feedback files, surfacing any write error even if a report failed
+            for write in feedback_writes:
+                write.result()
     
     print(f"✅ Final results saved to: {ai_output_dir}/")
     print(f"   📊 Grades CSV: ai_grading_results.csv")
@@ -316,8 +552,10 @@ def create_final_output(final_results: List, notebook_dir: str, assignment_id: s
     
     # Print summary
     print("\n📋 Multi-Run Summary:")
-    flagged_count = sum(1 for r in final_results if r.flagged_for_review)
-    avg_score = statistics.mean([r.total_score for r in final_results]) if final_results else 0
+    scores = np.fromiter((r.total_score for r in final_results), dtype=np.float64, count=len(final_results))
+    flagged = np.fromiter((r.flagged_for_review for r in final_results), dtype=bool, count=len(final_results))
+    flagged_count = int(flagged.sum())
+    avg_score = scores.mean() if scores.size else 0
     print(f"   📊 Total problems graded: {len(final_results)}")
     print(f"   🎯 Average score across all: {avg_score:.1f}")
     print(f"   🔍 Flagged for review: {flagged_count}")
@@ -354,19 +592,29 @@ def main():
         print(f"❌ Directory not found: {notebook_dir}")
         sys.exit(1)
     
-    # Run grading with each model
-    run_results = []
-    
-    for i, run_config in enumerate(runs_config, 1):
-        run_name = run_config.get('name', f'Run_{i}')
-        print(f"\n{'='*20} Run {i}/{len(runs_config)} {'='*20}")
-        
-        result = run_single_grading(notebook_dir, assignment_id, run_config, run_name)
-        if result:
-            run_results.append(result)
-        
-        # Brief pause between runs to avoid rate limiting
-        time.sleep(1)
+    # Run grading with each model. Runs are independent, I/O-bound API sequences,
+    # so they run concurrently (cap with multi_run_grading.max_parallel_runs if a provider rate-limits)
+    run_names = [run_config.get('name', f'Run_{i}') for i, run_config in enumerate(runs_config, 1)]
+    max_parallel = config.get('multi_run_grading', {}).get('max_parallel_runs') or len(runs_config)
+    notebooks_per_run = config.get('multi_run_grading', {}).get('max_parallel_notebooks', 8)
+    batch_size = config.get('multi_run_grading', {}).get('batch_size', 1)
+    max_batch_tokens = config.get('multi_run_grading', {}).get('max_batch_tokens', 6000)
+    print(f"\n{'='*20} Starting {len(runs_config)} runs ({min(max_parallel, len(runs_config))} at a time) {'='*20}")
+    
+    # Print each run's output as a block once it finishes instead of interleaving the runs line by line
+    run_output = ConcurrentRunOutput(sys.stdout)
+    sys.stdout = run_output
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+            futures = [
+                executor.submit(run_grading_buffered, run_output, notebook_dir, assignment_id, run_config, run_name,
+                                notebooks_per_run, batch_size, max_batch_tokens)
+                for run_config, run_name in zip(runs_config, run_names)
+            ]
+            # Collect in config order so aggregation is independent of completion order
+            run_results = [result for result in (future.result() for future in futures) if result]
+    finally:
+        sys.stdout = run_output._stream
     
     if not run_results:
         print("❌ No successful runs completed")
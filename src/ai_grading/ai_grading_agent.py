@@ -3,8 +3,10 @@
 Main AI Grading Agent that coordinates all components
 """
 
+import contextvars
 import os
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 from ..config.data_structures import GradingResult
 from ..core.notebook_parser import NotebookParser
 from ..reports.rubric_manager import RubricManager
@@ -15,10 +17,13 @@ from .llm_interface import LLMInterface
 class AIGradingAgent:
     """Main coordinating class for the AI grading system"""
     
-    def __init__(self, llm_interface: LLMInterface, rubrics_directory: str = "rubrics"):
+    def __init__(self, llm_interface: LLMInterface, rubrics_directory: str = "rubrics",
+                 batch_size: int = 1, max_batch_tokens: int = 6000):
         self.parser = NotebookParser()
         self.rubric_manager = RubricManager(rubrics_directory)
         self.grader = LLMGrader(llm_interface)
+        self.batch_size = max(1, batch_size)  # Responses graded per LLM call
+        self.max_batch_tokens = max_batch_tokens  # Approximate prompt-token budget per batched call
         self.results = []
     
     def grade_notebook(self, notebook_path: str, assignment_id: str) -> List[GradingResult]:
@@ -33,29 +38,63 @@ class AIGradingAgent:
         # Load rubric
         assignment_rubric = self.rubric_manager.load_assignment_rubric(assignment_id)
         
-        # Grade each response
-        notebook_results = []
-        
+        # Pair each response with its rubric
+        gradable = []
         for response in parsed_content['responses']:
             if response.problem_id in assignment_rubric:
-                rubric = assignment_rubric[response.problem_id]
-                
-                # Add assignment context
-                context = f"Assignment: {assignment_id}"
-                
-                result = self.grader.grade_response(response, rubric, context)
-                result.student_id = student_name
-                
-                notebook_results.append(result)
-                print(f"  Graded {response.problem_id}: {result.total_score}/{result.max_possible} ({result.percentage:.1f}%)")
+                gradable.append((response, assignment_rubric[response.problem_id]))
             else:
                 print(f"  Warning: No rubric found for {response.problem_id}")
         
+        # Add assignment context
+        context = f"Assignment: {assignment_id}"
+        
+        # Grade up to batch_size similar-length responses per LLM call, keeping notebook order in the results
+        graded = [None] * len(gradable)
+        
+        for batch in self._pack_batches(gradable):
+            for index, result in zip(batch, self.grader.grade_batch([gradable[i] for i in batch], context)):
+                result.student_id = student_name
+                graded[index] = result
+        
+        notebook_results = []
+        for result in graded:
+            notebook_results.append(result)
+            print(f"  Graded {result.problem_id}: {result.total_score}/{result.max_possible} ({result.percentage:.1f}%)")
+        
         self.results.extend(notebook_results)
         return notebook_results
     
-    def grade_directory(self, directory_path: str, assignment_id: str) -> Dict[str, List[GradingResult]]:
-        """Grade all notebooks in a directory"""
+    def _pack_batches(self, gradable: List) -> List[List[int]]:
+        """Group response indices into batches of similar length within the token budget"""
+        
+        if self.batch_size == 1:
+            return [[i] for i in range(len(gradable))]
+        
+        # Rough token estimate (~4 characters per token); sorting means each batch's cost
+        # is not dominated by one much longer response
+        approx_tokens = [
+            (len(response.content) + len(response.execution_output or "") + len(rubric.problem_statement)) // 4
+            for response, rubric in gradable
+        ]
+        
+        batches = []
+        current, current_tokens = [], 0
+        for i in sorted(range(len(gradable)), key=approx_tokens.__getitem__):
+            if current and (len(current) >= self.batch_size or current_tokens + approx_tokens[i] > self.max_batch_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += approx_tokens[i]
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    def grade_directory(self, directory_path: str, assignment_id: str, max_workers: Optional[int] = None,
+                        notebook_files: Optional[List[str]] = None) -> Dict[str, List[GradingResult]]:
+        """Grade all notebooks in a directory (or just notebook_files), up to max_workers concurrently
+        (default: the LLM's max_concurrent_requests)"""
         
         print(f"Starting AI grading for assignment: {assignment_id}")
         print(f"Directory: {directory_path}")
@@ -66,8 +105,10 @@ class AIGradingAgent:
             print(f"Error: {directory_path} is not a valid directory")
             return {}
         
-        # Find all notebook files
-        notebook_files = [f for f in os.listdir(directory_path) if f.endswith('.ipynb')]
+        # Find all notebook files unless the caller picked them
+        if notebook_files is None:
+            with os.scandir(directory_path) as entries:
+                notebook_files = [entry.name for entry in entries if entry.name.endswith('.ipynb') and entry.is_file()]
         
         if not notebook_files:
             print("No notebook files found!")
@@ -75,25 +116,38 @@ class AIGradingAgent:
         
         print(f"Found {len(notebook_files)} notebooks to grade")
         
-        all_results = {}
-        
-        for notebook_file in notebook_files:
-            notebook_path = os.path.join(directory_path, notebook_file)
-            
-            # Double-check that this is actually a jupyter notebook
-            if not notebook_path.endswith('.ipynb'):
-                print(f"Skipping {notebook_path} - not a Jupyter notebook")
-                continue
-
-            try:
-                results = self.grade_notebook(notebook_path, assignment_id)
-                all_results[notebook_file] = results
-            except Exception as e:
-                print(f"Error grading {notebook_file}: {e}")
-                all_results[notebook_file] = []
+        # Load the rubric once up front so worker threads only read the cached copy
+        self.rubric_manager.load_assignment_rubric(assignment_id)
+        
+        # Each notebook is an independent, network-bound LLM call, so grade them concurrently
+        if max_workers is None:
+            max_workers = self.grader.llm.max_concurrent_requests
+        workers = max(1, min(max_workers, len(notebook_files)))
+        # Run each notebook in a copy of the caller's context so context-local state (such as the
+        # multi-run output capture) follows it onto the worker thread
+        contexts = [contextvars.copy_context() for _ in notebook_files]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            graded = executor.map(
+                lambda context, notebook_file: context.run(
+                    self._grade_notebook_safe, directory_path, notebook_file, assignment_id
+                ),
+                contexts, notebook_files
+            )
+            all_results = dict(zip(notebook_files, graded))
         
         return all_results
     
+    def _grade_notebook_safe(self, directory_path: str, notebook_file: str, assignment_id: str) -> List[GradingResult]:
+        """Grade one notebook, returning an empty list instead of raising"""
+        
+        notebook_path = os.path.join(directory_path, notebook_file)
+        
+        try:
+            return self.grade_notebook(notebook_path, assignment_id)
+        except Exception as e:
+            print(f"Error grading {notebook_file}: {e}")
+            return []
+    
     def export_results(self, output_directory: str):
         """Export grading results using the report generator"""
         
@@ -4,6 +4,8 @@ Enhanced AI Grading Agent that incorporates reference solutions for better gradi
 """
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from ..config.data_structures import GradingResult
 from ..core.notebook_parser import NotebookParser
@@ -17,15 +19,22 @@ class EnhancedAIGradingAgent:
     """Enhanced grading agent that uses reference solutions for improved assessment"""
     
     def __init__(self, llm_interface: LLMInterface, rubrics_directory: str = "rubrics",
-                 use_reference_solutions: bool = True):
+                 use_reference_solutions: bool = True, max_parallel_responses: int = 4,
+                 max_parallel_notebooks: Optional[int] = None):
         self.parser = NotebookParser()
         self.rubric_manager = RubricManager(rubrics_directory)
         self.grader = LLMGrader(llm_interface)
         self.solution_generator = SolutionGenerator(llm_interface, temperature=0.7) if use_reference_solutions else None
         self.report_generator = None
         self.results = []
+        self._results_lock = threading.Lock()  # Notebooks are graded on worker threads
         self.reference_solutions = {}
         self.use_reference_solutions = use_reference_solutions
+        self.max_parallel_responses = max(1, max_parallel_responses)  # Responses graded concurrently per notebook
+        # One budget for every grading call in flight, however the notebook and response pools nest
+        self._llm_slots = threading.BoundedSemaphore(max(1, llm_interface.max_concurrent_requests))
+        # Notebooks graded concurrently by grade_directory (default: the LLM's max_concurrent_requests)
+        self.max_parallel_notebooks = max(1, max_parallel_notebooks or llm_interface.max_concurrent_requests)
     
     def generate_reference_solutions(self, assignment_id: str) -> Dict[str, ProblemSolution]:
         """Generate reference solutions for the assignment"""
@@ -45,8 +54,7 @@ class EnhancedAIGradingAgent:
         
         # Evaluate solution quality
         print("\n📊 Evaluating solution quality:")
-        for problem_id, solution in solutions.items():
-            quality = self.solution_generator.evaluate_solution_quality(solution)
+        for problem_id, quality in self.solution_generator.evaluate_solutions_quality(solutions).items():
             print(f"  {problem_id}: Overall quality {quality.overall_score:.2f}")
             if quality.overall_score < 0.7:
                 print(f"    ⚠️  Consider manual review - {quality.notes}")
@@ -70,22 +78,28 @@ class EnhancedAIGradingAgent:
             print(f"🔄 Generating reference solutions for {assignment_id}...")
             self.generate_reference_solutions(assignment_id)
         
-        # Grade each response
-        notebook_results = []
-        
+        # Pair each response with its rubric
+        gradable = []
         for response in parsed_content['responses']:
             if response.problem_id in assignment_rubric:
-                rubric = assignment_rubric[response.problem_id]
-                
-                # Enhanced grading with reference solution
-                result = self._grade_with_reference(response, rubric, assignment_id, student_name)
-                notebook_results.append(result)
-                
-                print(f"  ✅ Graded {response.problem_id}: {result.total_score}/{result.max_possible} ({result.percentage:.1f}%)")
+                gradable.append((response, assignment_rubric[response.problem_id]))
             else:
                 print(f"  ⚠️  Warning: No rubric found for {response.problem_id}")
         
-        self.results.extend(notebook_results)
+        # Each response's compare-then-grade chain is independent and network-bound, so run the
+        # chains concurrently: one response's parsing overlaps the others' LLM round trips
+        workers = max(1, min(self.max_parallel_responses, len(gradable)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            notebook_results = list(executor.map(
+                lambda item: self._grade_with_reference(item[0], item[1], assignment_id, student_name),
+                gradable
+            ))
+        
+        for result in notebook_results:
+            print(f"  ✅ Graded {result.problem_id}: {result.total_score}/{result.max_possible} ({result.percentage:.1f}%)")
+        
+        with self._results_lock:
+            self.results.extend(notebook_results)
         return notebook_results
     
     def _grade_with_reference(self, response, rubric, assignment_id: str, student_name: str) -> GradingResult:
@@ -102,9 +116,10 @@ class EnhancedAIGradingAgent:
             reference_solution = self.reference_solutions[assignment_id][response.problem_id]
             
             # Compare student response with reference
-            comparison = self.solution_generator.compare_student_solution(
-                response.content, reference_solution
-            )
+            with self._llm_slots:
+                comparison = self.solution_generator.compare_student_solution(
+                    response.content, reference_solution
+                )
             
             # Enhanced context for grading
             enhanced_context = f"""{context}
@@ -125,7 +140,8 @@ STUDENT COMPARISON ANALYSIS:
             context = enhanced_context
         
         # Grade using enhanced context
-        result = self.grader.grade_response(response, rubric, context)
+        with self._llm_slots:
+            result = self.grader.grade_response(response, rubric, context)
         result.student_name = student_name
         
         return result
@@ -149,7 +165,8 @@ STUDENT COMPARISON ANALYSIS:
             return {}
         
         # Find notebook files
-        notebook_files = [f for f in os.listdir(directory_path) if f.endswith('.ipynb')]
+        with os.scandir(directory_path) as entries:
+            notebook_files = [entry.name for entry in entries if entry.name.endswith('.ipynb') and entry.is_file()]
         
         if not notebook_files:
             print("❌ No notebook files found!")
@@ -157,29 +174,37 @@ STUDENT COMPARISON ANALYSIS:
         
         print(f"📊 Found {len(notebook_files)} notebooks to grade")
         
-        all_results = {}
+        # Load the rubric and reference solutions once up front so worker threads only read them
+        self.rubric_manager.load_assignment_rubric(assignment_id)
+        if self.use_reference_solutions and assignment_id not in self.reference_solutions:
+            self.generate_reference_solutions(assignment_id)
         
-        for notebook_file in notebook_files:
-            notebook_path = os.path.join(directory_path, notebook_file)
-            
-            if not os.path.isfile(notebook_path):
-                print(f"⏭️  Skipping {notebook_path} - not a file")
-                continue
-                
-            try:
-                if self.use_reference_solutions:
-                    results = self.grade_notebook_with_reference(notebook_path, assignment_id)
-                else:
-                    # Fallback to basic grading
-                    results = self._grade_notebook_basic(notebook_path, assignment_id)
-                
-                all_results[notebook_file] = results
-            except Exception as e:
-                print(f"❌ Error grading {notebook_file}: {e}")
-                all_results[notebook_file] = []
+        # Each notebook is independent and network-bound, so grade them concurrently; the LLM calls
+        # of all notebooks and their response pools share the _llm_slots budget
+        workers = max(1, min(self.max_parallel_notebooks, len(notebook_files)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            graded = executor.map(
+                lambda notebook_file: self._grade_notebook_safe(directory_path, notebook_file, assignment_id),
+                notebook_files
+            )
+            all_results = dict(zip(notebook_files, graded))
         
         return all_results
     
+    def _grade_notebook_safe(self, directory_path: str, notebook_file: str, assignment_id: str) -> List[GradingResult]:
+        """Grade one notebook, returning an empty list instead of raising"""
+        
+        notebook_path = os.path.join(directory_path, notebook_file)
+        
+        try:
+            if self.use_reference_solutions:
+                return self.grade_notebook_with_reference(notebook_path, assignment_id)
+            # Fallback to basic grading
+            return self._grade_notebook_basic(notebook_path, assignment_id)
+        except Exception as e:
+            print(f"❌ Error grading {notebook_file}: {e}")
+            return []
+    
     def _grade_notebook_basic(self, notebook_path: str, assignment_id: str) -> List[GradingResult]:
         """Basic grading without reference solutions (fallback)"""
         
@@ -194,11 +219,13 @@ STUDENT COMPARISON ANALYSIS:
                 rubric = assignment_rubric[response.problem_id]
                 context = f"Assignment: {assignment_id}\nStudent: {student_name}"
                 
-                result = self.grader.grade_response(response, rubric, context)
+                with self._llm_slots:
+                    result = self.grader.grade_response(response, rubric, context)
                 result.student_name = student_name
                 notebook_results.append(result)
         
-        self.results.extend(notebook_results)
+        with self._results_lock:
+            self.results.extend(notebook_results)
         return notebook_results
     
     def export_results(self, output_directory: str):
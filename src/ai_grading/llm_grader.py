@@ -5,7 +5,7 @@ LLM-based grading engine for evaluating student responses
 
 import json
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
 from ..config.data_structures import StudentResponse, ProblemRubric, GradingResult
 from .llm_interface import LLMInterface
 
@@ -41,6 +41,66 @@ class LLMGrader:
             print(f"Error grading response: {e}")
             return self._create_error_result(response, rubric, str(e))
     
+    def grade_batch(self, items: List[Tuple[StudentResponse, ProblemRubric]],
+                    assignment_context: str = "") -> List[GradingResult]:
+        """Grade several responses with one LLM call, falling back to one call per response"""
+        
+        if len(items) <= 1:
+            return [self.grade_response(response, rubric, assignment_context) for response, rubric in items]
+        
+        # Each response gets up to 1500 output tokens; split batches that would exceed the model's limit
+        per_call = max(1, self.llm.max_output_tokens // 1500)
+        if len(items) > per_call:
+            return [result for start in range(0, len(items), per_call)
+                    for result in self.grade_batch(items[start:start + per_call], assignment_context)]
+        
+        prompt = self._construct_batch_prompt(items, assignment_context)
+        
+        try:
+            llm_response = self.llm.generate_response(prompt, max_tokens=1500 * len(items))
+            
+            json_start = llm_response.find('[')
+            json_end = llm_response.rfind(']') + 1
+            if json_start == -1 or json_end == 0:
+                raise ValueError("No JSON array found in LLM response")
+            
+            parsed = json.loads(llm_response[json_start:json_end])
+            if not isinstance(parsed, list) or len(parsed) != len(items) or not all(isinstance(p, dict) for p in parsed):
+                raise ValueError(f"Expected {len(items)} grading objects")
+        except Exception as e:
+            print(f"Batch grading failed ({e}); grading {len(items)} responses individually")
+            return [self.grade_response(response, rubric, assignment_context) for response, rubric in items]
+        
+        results = []
+        for (response, rubric), graded in zip(items, parsed):
+            result = self._parse_llm_response(json.dumps(graded), response, rubric)
+            self.grading_history.append({
+                'timestamp': datetime.now(),
+                'student': response.problem_id,
+                'prompt': prompt,
+                'llm_response': llm_response,
+                'result': result
+            })
+            results.append(result)
+        
+        return results
+    
+    def _construct_batch_prompt(self, items: List[Tuple[StudentResponse, ProblemRubric]],
+                                context: str) -> str:
+        """Combine individual grading prompts into one request that returns a JSON array"""
+        
+        sections = "\n\n".join(
+            f"=== SUBMISSION {i} of {len(items)} ===\n{self._construct_grading_prompt(response, rubric, context)}"
+            for i, (response, rubric) in enumerate(items, 1)
+        )
+        
+        return f"""You will grade {len(items)} independent submissions. Each one below is a complete grading task with its own problem, criteria and student response. Grade each one on its own merits.
+
+{sections}
+
+=== OUTPUT ===
+Return a JSON array with exactly {len(items)} objects, one per submission in the order given. Each object must use the JSON format requested in its submission."""
+    
     def _construct_grading_prompt(self, response: StudentResponse, rubric: ProblemRubric, 
                                 context: str) -> str:
         """Construct detailed grading prompt for the LLM"""
@@ -4,7 +4,13 @@ LLM interface and implementations for different providers
 """
 
 import json
+import os
+import time
+import hashlib
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Optional
 
 # ============================================================================
 # Abstract LLM Interface
@@ -13,6 +19,15 @@ from abc import ABC, abstractmethod
 class LLMInterface(ABC):
     """Abstract interface for different LLM providers"""
     
+    # How many calls callers keep in flight at once (sizes their thread pools). Hosted APIs are
+    # rate-limited, so the default is modest; for a continuous-batching server (vLLM, TGI, SGLang)
+    # raise it to match the server's capacity (e.g. vLLM's --max-num-seqs) so requests share decode steps
+    max_concurrent_requests: int = 8
+    
+    # Largest max_tokens a single call may ask for; batched calls are split to stay under it
+    # (4096 is the output limit of the default gpt-4 and Claude 3 models)
+    max_output_tokens: int = 4096
+    
     @abstractmethod
     def generate_response(self, prompt: str, max_tokens: int = 1000) -> str:
         """Generate response from the LLM"""
@@ -52,6 +67,9 @@ class MockLLM(LLMInterface):
     def get_model_name(self) -> str:
         return "MockLLM-v1.0"
 
+# What the providers return when their API call fails (MockLLM's reply ignores the prompt)
+_MOCK_RESPONSE = MockLLM().generate_response("")
+
 # ============================================================================
 # OpenAI GPT Implementation
 # ============================================================================
@@ -131,4 +149,116 @@ class AnthropicClaude(LLMInterface):
             return MockLLM().generate_response(prompt, max_tokens)
     
     def get_model_name(self) -> str:
-        return f"Anthropic-{self.model}"
\ No newline at end of file
+        return f"Anthropic-{self.model}"
+
+# ============================================================================
+# Persistent Response Cache
+# ============================================================================
+
+class CachedLLM(LLMInterface):
+    """Wraps another LLM and serves repeated prompts from an on-disk cache"""
+    
+    # Calls currently being made, keyed by cache path and shared by every instance,
+    # so identical prompts issued concurrently (e.g. by parallel runs) hit the API once
+    _inflight = {}
+    _inflight_lock = threading.Lock()
+    
+    def __init__(self, llm: LLMInterface, cache_directory: str = "~/.cache/ai_grader",
+                 ttl_seconds: Optional[float] = 30 * 24 * 3600, key_prefix: str = ""):
+        self.llm = llm
+        self.key_prefix = key_prefix  # Extra settings that change the output (e.g. provider, temperature)
+        self.cache_directory = os.path.expanduser(cache_directory)
+        self.ttl_seconds = ttl_seconds  # None keeps entries forever
+        os.makedirs(self.cache_directory, exist_ok=True)
+    
+    def _cache_path(self, prompt: str, max_tokens: int) -> str:
+        """Content-addressed path for a (key prefix, model, max_tokens, prompt) tuple"""
+        # Line endings and trailing whitespace never change what a student wrote, so answers
+        # that differ only in those share an entry (indentation is kept; it matters in code)
+        normalized = "\n".join(line.rstrip() for line in prompt.splitlines()).strip()
+        key = hashlib.blake2b(
+            f"{self.key_prefix}\0{self.llm.get_model_name()}\0{max_tokens}\0{normalized}".encode('utf-8'), digest_size=16
+        ).hexdigest()
+        return os.path.join(self.cache_directory, f"{key}.json")
+    
+    def _read_cached(self, cache_path: str) -> Optional[str]:
+        """The cached response at cache_path, or None if missing, unreadable or expired"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if self.ttl_seconds is None or time.time() - entry['created'] < self.ttl_seconds:
+                return entry['response']
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+    
+    def _write_cached(self, cache_path: str, response: str):
+        """Store a response atomically; a failed write only costs a future cache hit, so it just warns"""
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created': time.time(), 'response': response}, f)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: could not write LLM response cache {cache_path}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    
+    def generate_response(self, prompt: str, max_tokens: int = 1000) -> str:
+        """Return the cached response if fresh, otherwise call the wrapped LLM"""
+        cache_path = self._cache_path(prompt, max_tokens)
+        
+        cached = self._read_cached(cache_path)
+        if cached is not None:
+            return cached
+        
+        # Join an identical call that is already in flight instead of issuing another
+        with CachedLLM._inflight_lock:
+            pending = CachedLLM._inflight.get(cache_path)
+            if pending is None:
+                CachedLLM._inflight[cache_path] = pending = Future()
+                is_owner = True
+            else:
+                is_owner = False
+        
+        if not is_owner:
+            return pending.result()
+        
+        try:
+            # The previous owner may have written the file and retired just after our lookup missed
+            response = self._read_cached(cache_path)
+            already_cached = response is not None
+            if not already_cached:
+                response = self.llm.generate_response(prompt, max_tokens)
+        except BaseException as e:
+            with CachedLLM._inflight_lock:
+                del CachedLLM._inflight[cache_path]
+            pending.set_exception(e)
+            raise
+        
+        # Only retire the in-flight entry once the file is written, so a caller arriving in
+        # between finds one or the other instead of calling the API again
+        try:
+            # Provider errors fall back to the mock response; never persist those
+            if not already_cached and (isinstance(self.llm, MockLLM) or response != _MOCK_RESPONSE):
+                # Written atomically so concurrent graders never read a partial file
+                self._write_cached(cache_path, response)
+        finally:
+            with CachedLLM._inflight_lock:
+                del CachedLLM._inflight[cache_path]
+            pending.set_result(response)
+        
+        return response
+    
+    @property
+    def max_concurrent_requests(self) -> int:
+        return self.llm.max_concurrent_requests
+    
+    @property
+    def max_output_tokens(self) -> int:
+        return self.llm.max_output_tokens
+    
+    def get_model_name(self) -> str:
+        return self.llm.get_model_name()
@@ -1,23 +1,62 @@
-import nbformat
 import sys
 import os
 import csv
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import NamedTuple
 
-def calculate_answered_percentage(notebook_path):
+# Works both as part of the src.core package and as a standalone script
+try:
+    from .notebook_io import load_notebook_cells
+except ImportError:
+    from notebook_io import load_notebook_cells
+
+# Column headers of the grades CSV written by process_student_notebooks
+GRADES_CSV_COLUMNS = [
+    'Student Name', 
+    'Code Cells Answered (%)', 
+    'Markdown Cells Answered (%)', 
+    'Total Answered (%)', 
+    'Final Grade',
+    'Missing Answers Count'
+]
+
+# Marker that precedes a student's written answer, and the template placeholder left in unanswered cells
+ANSWER_MARKER = '✏️ **Answer:**'
+PLACEHOLDER = '*Put your answers here!*'
+
+# Tags that mark a cell as holding a student's answer
+ANSWER_TAGS = frozenset({'code answer', 'text answer'})
+
+class CellView(NamedTuple):
+    """The parts of a notebook cell that calculate_answered_percentage inspects"""
+    cell_type: str
+    source: str
+    tags: frozenset
+
+# Matches any line whose first non-whitespace character is not a comment marker
+# (line starts are the same boundaries str.splitlines() uses, not just '\n')
+_CODE_LINE = re.compile(r'(?:^|[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029])\s*[^#\s]', re.MULTILINE)
+
+def calculate_answered_percentage(notebook_path, strict=False):
     """
     Calculates the percentage of answered code cells and markdown cells in a Jupyter notebook.
     
     Parameters:
     notebook_path (str): The path to the Jupyter notebook to be graded.
+    strict (bool): Validate the notebook with nbformat while loading (see load_notebook_cells).
     
     Returns:
     tuple: A tuple containing the percentages of answered code cells, answered markdown cells, 
            the total percentage of answered cells, and a list of missing answers.
     """
     
-    # Load the notebook
-    with open(notebook_path, 'r', encoding='utf-8') as file:
-        notebook = nbformat.read(file, as_version=4)
+    # Load the notebook, reducing each cell to the fields the checks below read
+    cells = [
+        CellView(cell['cell_type'], cell['source'], frozenset(cell.get('metadata', {}).get('tags') or ()))
+        for cell in load_notebook_cells(notebook_path, strict)
+    ]
     
     # Initialize counters and tracking for missing answers
     total_code_cells = 0
@@ -27,38 +66,36 @@ def calculate_answered_percentage(notebook_path):
     missing_answers = []
     
     # Iterate through the cells to count the tagged answer cells and detect answers by content
-    for i, cell in enumerate(notebook['cells']):
-        if cell['cell_type'] == 'code':
+    for i, (cell_type, source, tags) in enumerate(cells):
+        if cell_type == 'code':
             total_code_cells += 1
             # Consider a cell answered if it's tagged or contains code beyond comments
-            if 'code answer' in cell.get('metadata', {}).get('tags', []) or \
-               any(line.strip() for line in cell['source'].splitlines() if not line.strip().startswith('#')):
+            if 'code answer' in tags or _CODE_LINE.search(source):
                 answered_code_cells += 1
         
-        elif cell['cell_type'] == 'markdown':
+        elif cell_type == 'markdown':
             total_markdown_cells += 1
             # Consider a markdown cell answered if:
             # 1. It's tagged as 'text answer'.
-            # 2. It contains non-empty text after '✏️ **Answer:**' that is different from '*Put your answers here!*'.
-            content_after_answer = cell['source'].split('✏️ **Answer:**', 1)[-1].strip() if '✏️ **Answer:**' in cell['source'] else cell['source'].strip()
-            if 'text answer' in cell.get('metadata', {}).get('tags', []) and \
-               content_after_answer and content_after_answer != "*Put your answers here!*":
-                answered_markdown_cells += 1
+            # 2. It contains non-empty text after ANSWER_MARKER that is different from PLACEHOLDER.
+            if 'text answer' in tags:
+                marker_index = source.find(ANSWER_MARKER)
+                content_after_answer = (source[marker_index + len(ANSWER_MARKER):] if marker_index >= 0 else source).strip()
+                if content_after_answer and content_after_answer != PLACEHOLDER:
+                    answered_markdown_cells += 1
 
         # Check for missing answers after a "task" cell
-        if 'task' in cell.get('metadata', {}).get('tags', []):
-            if i + 1 < len(notebook['cells']):
-                next_cell = notebook['cells'][i + 1]
-                if not ('code answer' in next_cell.get('metadata', {}).get('tags', []) or
-                        'text answer' in next_cell.get('metadata', {}).get('tags', [])):
-                    # Record the missing answer information with cell numbers
-                    missing_answers.append({
-                        'task_cell_number': i + 1,
-                        'task_content': cell['source'].strip(),
-                        'following_cell_number': i + 2,
-                        'following_cell_content': next_cell['source'].strip(),
-                        'following_cell_type': next_cell['cell_type']
-                    })
+        if 'task' in tags and i + 1 < len(cells):
+            next_cell = cells[i + 1]
+            if not (next_cell.tags & ANSWER_TAGS):
+                # Record the missing answer information with cell numbers
+                missing_answers.append({
+                    'task_cell_number': i + 1,
+                    'task_content': source.strip(),
+                    'following_cell_number': i + 2,
+                    'following_cell_content': next_cell.source.strip(),
+                    'following_cell_type': next_cell.cell_type
+                })
 
     # Calculate percentages
     code_answered_percentage = (answered_code_cells / total_code_cells * 100) if total_code_cells > 0 else 0
@@ -107,44 +144,61 @@ def create_individual_report(student_name, missing_answers, reports_directory):
     report_filename = f"{safe_filename}_missing_answers_report.txt"
     report_path = os.path.join(reports_directory, report_filename)
     
+    # Build the whole report in memory and write it with a single call
+    parts = [
+        "=" * 60 + "\n",
+        f"MISSING ANSWERS REPORT FOR: {student_name}\n",
+        "=" * 60 + "\n\n",
+        f"Total Missing Answers: {len(missing_answers)}\n",
+        f"Report Generated: {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+    ]
+    
+    for idx, missing in enumerate(missing_answers, 1):
+        parts.append(
+            f"MISSING ANSWER #{idx}\n"
+            + "-" * 40 + "\n"
+            f"Task Cell Number: {missing['task_cell_number']}\n"
+            f"Expected Answer Cell Number: {missing['following_cell_number']}\n"
+            f"Following Cell Type: {missing['following_cell_type']}\n\n"
+            "TASK CONTENT:\n"
+            + "-" * 20 + "\n"
+            f"{missing['task_content']}\n\n"
+            "CURRENT CONTENT IN FOLLOWING CELL:\n"
+            + "-" * 20 + "\n"
+            + (f"{missing['following_cell_content']}\n" if missing['following_cell_content'] else "[EMPTY CELL]\n")
+            + "\n" + "=" * 60 + "\n\n"
+        )
+    
+    parts.append(
+        "RECOMMENDATIONS:\n"
+        + "-" * 20 + "\n"
+        "1. Review each task above and provide appropriate answers\n"
+        "2. Make sure answer cells are properly tagged with 'code answer' or 'text answer'\n"
+        "3. For text answers, use the format: ✏️ **Answer:** followed by your response\n"
+        "4. For code answers, write actual code (not just comments)\n"
+    )
+    
     with open(report_path, 'w', encoding='utf-8') as report_file:
-        report_file.write("=" * 60 + "\n")
-        report_file.write(f"MISSING ANSWERS REPORT FOR: {student_name}\n")
-        report_file.write("=" * 60 + "\n\n")
-        
-        report_file.write(f"Total Missing Answers: {len(missing_answers)}\n")
-        report_file.write(f"Report Generated: {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
-        for idx, missing in enumerate(missing_answers, 1):
-            report_file.write(f"MISSING ANSWER #{idx}\n")
-            report_file.write("-" * 40 + "\n")
-            report_file.write(f"Task Cell Number: {missing['task_cell_number']}\n")
-            report_file.write(f"Expected Answer Cell Number: {missing['following_cell_number']}\n")
-            report_file.write(f"Following Cell Type: {missing['following_cell_type']}\n\n")
-            
-            report_file.write("TASK CONTENT:\n")
-            report_file.write("-" * 20 + "\n")
-            report_file.write(f"{missing['task_content']}\n\n")
-            
-            report_file.write("CURRENT CONTENT IN FOLLOWING CELL:\n")
-            report_file.write("-" * 20 + "\n")
-            if missing['following_cell_content']:
-                report_file.write(f"{missing['following_cell_content']}\n")
-            else:
-                report_file.write("[EMPTY CELL]\n")
-            
-            report_file.write("\n" + "=" * 60 + "\n\n")
-        
-        report_file.write("RECOMMENDATIONS:\n")
-        report_file.write("-" * 20 + "\n")
-        report_file.write("1. Review each task above and provide appropriate answers\n")
-        report_file.write("2. Make sure answer cells are properly tagged with 'code answer' or 'text answer'\n")
-        report_file.write("3. For text answers, use the format: ✏️ **Answer:** followed by your response\n")
-        report_file.write("4. For code answers, write actual code (not just comments)\n")
+        report_file.write("".join(parts))
     
     return report_path
 
-def process_student_notebooks(directory_path, output_csv):
+# Below this many notebooks the process start-up cost outweighs the parallel speedup
+PARALLEL_NOTEBOOK_THRESHOLD = 8
+
+def _analyze_notebook(notebook_path, strict=False):
+    """
+    Worker for process_student_notebooks: runs calculate_answered_percentage and captures any error.
+    
+    Returns:
+    tuple: (result tuple or None, error message or None)
+    """
+    try:
+        return calculate_answered_percentage(notebook_path, strict), None
+    except Exception as e:
+        return None, str(e)
+
+def process_student_notebooks(directory_path, output_csv, max_workers=None, strict=False):
     """
     Processes all student notebooks in a directory and writes the grading results to a CSV file.
     Creates individual missing answers reports for each student.
@@ -153,9 +207,13 @@ def process_student_notebooks(directory_path, output_csv):
     Parameters:
     directory_path (str): The path to the directory containing the student notebooks.
     output_csv (str): The path to the output CSV file.
+    max_workers (int, optional): Processes used to analyze notebooks (default: one per CPU).
+                                 Small batches and max_workers=1 are analyzed in-process.
+    strict (bool): Validate each notebook with nbformat while loading (slower).
     
     Returns:
-    None
+    list: The result rows written to the CSV (columns as in GRADES_CSV_COLUMNS), or an empty list
+          if no notebooks were found.
     """
     results = []
     reports_created = []
@@ -174,19 +232,30 @@ def process_student_notebooks(directory_path, output_csv):
     
     if not notebook_files:
         print(f"No Jupyter notebooks found in '{directory_path}'")
-        return
+        return []
     
     print(f"Processing {len(notebook_files)} notebook(s)...")
     print("-" * 50)
     
-    for filename in notebook_files:
+    # Analysis is CPU-bound pure Python, so fan it out across processes; reports are written here
+    notebook_paths = [os.path.join(directory_path, filename) for filename in notebook_files]
+    analyze = partial(_analyze_notebook, strict=strict)
+    if len(notebook_paths) >= PARALLEL_NOTEBOOK_THRESHOLD and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            analyses = list(executor.map(analyze, notebook_paths, chunksize=4))
+    else:
+        analyses = [analyze(notebook_path) for notebook_path in notebook_paths]
+    
+    for filename, (analysis, error) in zip(notebook_files, analyses):
         print(f"Processing notebook: {filename}")
         
-        notebook_path = os.path.join(directory_path, filename)
         student_name = filename.replace('.ipynb', '').replace('_', ' ')
         
         try:
-            code_percentage, markdown_percentage, total_percentage, missing_answers = calculate_answered_percentage(notebook_path)
+            if error is not None:
+                raise Exception(error)
+            
+            code_percentage, markdown_percentage, total_percentage, missing_answers = analysis
             grade = grade_assignment(code_percentage, markdown_percentage)
             
             # Add results to the main list
@@ -221,33 +290,29 @@ def process_student_notebooks(directory_path, output_csv):
     # Write the main results to a CSV file
     with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
         csvwriter = csv.writer(csvfile)
-        csvwriter.writerow([
-            'Student Name', 
-            'Code Cells Answered (%)', 
-            'Markdown Cells Answered (%)', 
-            'Total Answered (%)', 
-            'Final Grade',
-            'Missing Answers Count'
-        ])
+        csvwriter.writerow(GRADES_CSV_COLUMNS)
         csvwriter.writerows(results)
     
     # Create a summary report in the same directory
     summary_path = output_csv.replace('.csv', '_summary.txt')
+    summary_parts = [
+        "GRADING SUMMARY REPORT\n",
+        "=" * 50 + "\n\n",
+        f"Total students processed: {len(results)}\n",
+        f"Individual reports created: {len(reports_created)}\n",
+        f"Main grades file: {output_csv}\n",
+        f"Reports directory: {reports_directory}\n\n",
+    ]
+    
+    if reports_created:
+        summary_parts.append("INDIVIDUAL REPORTS CREATED:\n" + "-" * 30 + "\n")
+        summary_parts.extend(f"• {student_name}: {os.path.basename(report_path)}\n"
+                             for student_name, report_path in reports_created)
+    else:
+        summary_parts.append("No individual reports were needed (all students completed their work perfectly!)\n")
+    
     with open(summary_path, 'w', encoding='utf-8') as summary_file:
-        summary_file.write("GRADING SUMMARY REPORT\n")
-        summary_file.write("=" * 50 + "\n\n")
-        summary_file.write(f"Total students processed: {len(results)}\n")
-        summary_file.write(f"Individual reports created: {len(reports_created)}\n")
-        summary_file.write(f"Main grades file: {output_csv}\n")
-        summary_file.write(f"Reports directory: {reports_directory}\n\n")
-        
-        if reports_created:
-            summary_file.write("INDIVIDUAL REPORTS CREATED:\n")
-            summary_file.write("-" * 30 + "\n")
-            for student_name, report_path in reports_created:
-                summary_file.write(f"• {student_name}: {os.path.basename(report_path)}\n")
-        else:
-            summary_file.write("No individual reports were needed (all students completed their work perfectly!)\n")
+        summary_file.write("".join(summary_parts))
     
     print("=" * 60)
     print("GRADING COMPLETE!")
@@ -262,6 +327,8 @@ def process_student_notebooks(directory_path, output_csv):
         print(f"\nStudents with missing answers:")
         for student_name, _ in reports_created:
             print(f"  • {student_name}")
+    
+    return results
 
 if __name__ == "__main__":
     """
@@ -270,11 +337,12 @@ if __name__ == "__main__":
     It also creates individual missing answers reports for each student who has incomplete work.
 
     Usage:
-    python notebook_grader.py <directory_path> <output_csv>
+    python notebook_grader.py <directory_path> <output_csv> [--strict]
     
     Arguments:
     <directory_path>: Path to the directory containing the student notebooks.
     <output_csv>: Path to the output CSV file where results will be saved.
+    --strict: Validate each notebook with nbformat while loading (slower).
     
     Example:
     python notebook_grader.py /path/to/student_notebooks/ results.csv
@@ -284,8 +352,9 @@ if __name__ == "__main__":
     - results_summary.txt: Summary of grading process
     - individual_reports/: Directory containing individual student reports
     """
-    if len(sys.argv) != 3:
-        print("Usage: python notebook_grader.py <directory_path> <output_csv>")
+    strict = '--strict' in sys.argv[3:]
+    if len(sys.argv) != 3 + strict:
+        print("Usage: python notebook_grader.py <directory_path> <output_csv> [--strict]")
         print("\nExample: python notebook_grader.py Homework/HW01_renamed grades.csv")
         sys.exit(1)
     
@@ -298,4 +367,4 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # Process the student notebooks and save results to CSV
-    process_student_notebooks(directory_path, output_csv)
\ No newline at end of file
+    process_student_notebooks(directory_path, output_csv, strict=strict)
@@ -0,0 +1,140 @@
+# notebook_io.py
+"""
+Loads notebook cells for the completion grader and the AI notebook parser, caching the parsed cells
+"""
+
+import os
+import json
+from functools import lru_cache
+
+# orjson is optional; it parses notebook JSON several times faster than the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson is optional; with it, very large notebooks are streamed one cell at a time
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Notebooks at least this large are streamed (when ijson is available) instead of parsed whole,
+# since embedded images and outputs can make the full JSON tree many times the file size
+STREAMING_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+# How many parsed notebooks read_notebook_cells keeps; set AI_GRADER_NOTEBOOK_CACHE_SIZE to change it
+NOTEBOOK_CACHE_SIZE = int(os.environ.get('AI_GRADER_NOTEBOOK_CACHE_SIZE', '32'))
+
+# Bitmap outputs, kept only as their base64 length by read_notebook_cells
+_BITMAP_FORMATS = ('image/png', 'image/jpeg')
+# Output MIME types the graders read; everything else is dropped by read_notebook_cells
+_KEPT_OUTPUT_FORMATS = ('text/plain', 'text/html', 'image/svg+xml') + _BITMAP_FORMATS
+
+def _stream_notebook_cells(notebook_path):
+    """
+    Streams the top-level cells array with ijson, keeping only the fields the grader reads.
+    
+    Parameters:
+    notebook_path (str): The path to the Jupyter notebook.
+    
+    Returns:
+    list: Slim cell dicts (cell_type, source, metadata.tags); empty if there is no top-level cells array.
+    """
+    cells = []
+    with open(notebook_path, 'rb') as file:
+        for cell in ijson.items(file, 'cells.item'):
+            source = cell['source']
+            cells.append({
+                'cell_type': cell['cell_type'],
+                'source': ''.join(source) if isinstance(source, list) else source,
+                'metadata': {'tags': cell.get('metadata', {}).get('tags') or []}
+            })
+    return cells
+
+def _slim_cell(cell):
+    """Copies the fields the graders read from a cell; bitmap outputs keep only their base64 length."""
+    source = cell['source']
+    slim = {
+        'cell_type': cell['cell_type'],
+        # On disk, sources may be stored as a list of lines
+        'source': ''.join(source) if isinstance(source, list) else source,
+        'metadata': {'tags': cell.get('metadata', {}).get('tags') or []}
+    }
+    
+    if 'outputs' in cell:
+        outputs = []
+        for output in cell['outputs']:
+            slim_output = {'output_type': output.get('output_type', 'unknown')}
+            if 'text' in output:
+                slim_output['text'] = output['text']
+            if 'data' in output:
+                data = output['data']
+                slim_output['data'] = {
+                    mime: len(data[mime]) if mime in _BITMAP_FORMATS and isinstance(data[mime], str) else data[mime]
+                    for mime in _KEPT_OUTPUT_FORMATS if mime in data
+                }
+            outputs.append(slim_output)
+        slim['outputs'] = outputs
+    
+    return slim
+
+@lru_cache(maxsize=NOTEBOOK_CACHE_SIZE)
+def _read_notebook_cells_cached(notebook_path, mtime_ns, size):
+    """Parses a notebook once per (path, mtime, size); see read_notebook_cells."""
+    with open(notebook_path, 'rb') as file:
+        raw = file.read()
+    notebook = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    
+    if notebook.get('nbformat', 4) < 4:
+        import nbformat
+        cells = nbformat.reads(raw.decode('utf-8'), as_version=4)['cells']
+    else:
+        cells = notebook['cells']
+    
+    # Only the slim copies are cached, so embedded images don't stay in memory
+    return [_slim_cell(cell) for cell in cells]
+
+def read_notebook_cells(notebook_path):
+    """
+    Loads the cells of a Jupyter notebook as plain dicts with string sources, keeping the fields
+    the graders read: cell_type, source, metadata.tags and outputs (output_type, text, and the
+    text/plain, text/html, SVG, PNG and JPEG data; PNG/JPEG base64 strings are replaced by their length).
+    The slim cells are cached per file version (up to NOTEBOOK_CACHE_SIZE notebooks), so the completion
+    grader and the AI notebook parser share them, as do repeated grading runs over the same notebooks.
+    Callers must not modify the cells.
+    
+    Parameters:
+    notebook_path (str): The path to the Jupyter notebook.
+    
+    Returns:
+    list: The notebook's cells.
+    """
+    stat = os.stat(notebook_path)
+    return _read_notebook_cells_cached(os.path.abspath(notebook_path), stat.st_mtime_ns, stat.st_size)
+
+def load_notebook_cells(notebook_path, strict=False):
+    """
+    Loads the cells of a Jupyter notebook as plain dicts with string sources.
+    
+    Parameters:
+    notebook_path (str): The path to the Jupyter notebook.
+    strict (bool): Read through nbformat, validating the notebook, instead of the cached raw
+                   JSON parse of read_notebook_cells.
+                   Otherwise notebooks over STREAMING_THRESHOLD_BYTES are streamed if ijson is installed.
+    
+    Returns:
+    list: The notebook's cells.
+    """
+    if not strict:
+        if ijson is not None and os.path.getsize(notebook_path) >= STREAMING_THRESHOLD_BYTES:
+            cells = _stream_notebook_cells(notebook_path)
+            if cells:
+                return cells
+            # No top-level cells array (empty or pre-v4 notebook): fall through to a full parse
+        
+        return read_notebook_cells(notebook_path)
+    
+    import nbformat
+    with open(notebook_path, 'r', encoding='utf-8') as file:
+        return nbformat.read(file, as_version=4)['cells']
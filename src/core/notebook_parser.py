@@ -4,31 +4,72 @@
 Notebook parsing functionality for extracting structured content from student notebooks
 """
 
-import nbformat
 import os
 import re
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Dict, List, Optional, Any, Tuple
 from ..config.data_structures import StudentResponse
 from ..utils.student_id_manager import StudentIDManager
+from .notebook_io import read_notebook_cells
+
+# Problem headings, e.g. "## Part 1: ..." or "## Problem 2. ..." (both colon and period allowed);
+# tried in order, so a cell with both kinds of heading is identified by its Part heading
+_PROBLEM_HEADING_RES = (
+    re.compile(r'##\s*Part\s*(\d+)[\.:]\s*(.+)', re.IGNORECASE),
+    re.compile(r'##\s*Problem\s*(\d+)[\.:]\s*(.+)', re.IGNORECASE),
+)
+
+# SVG dimension attributes, searched for every SVG output
+_SVG_WIDTH_RE = re.compile(r'width=["\']?(\d+(?:\.\d+)?)')
+_SVG_HEIGHT_RE = re.compile(r'height=["\']?(\d+(?:\.\d+)?)')
+
+# Markers used by _is_answer_cell to tell problem statements from answers
+_PROBLEM_INDICATORS = ('##', '(10)', '(20)', '(30)', '(40)', 'points)', '---')
+_ANSWER_INDICATORS = ('answer:', '**answer:**', 'solution:', 'response:', '###', 'interpretation:', 'why these help:')
+# Image MIME types in order of preference; only the first one present is described
+_IMAGE_FORMATS = ('image/png', 'image/jpeg', 'image/svg+xml')
+
+_PROBLEM_INDICATOR_RE = re.compile('|'.join(map(re.escape, _PROBLEM_INDICATORS)))
+_ANSWER_INDICATOR_RE = re.compile('|'.join(map(re.escape, _ANSWER_INDICATORS)), re.IGNORECASE)
+
+# Most notebooks NotebookParser keeps parsed results for; the oldest entry is dropped beyond this
+PARSE_CACHE_SIZE = 1024
+
+def _as_text(value) -> str:
+    """Join list-style notebook text fields into a single string"""
+    return ''.join(value) if isinstance(value, list) else str(value)
 
 class NotebookParser:
     """Enhanced parser that extracts structured content from student notebooks"""
     
     def __init__(self, id_manager: Optional[StudentIDManager] = None, use_anonymization: bool = False):
-        self.problem_patterns = [
-            r'##\s*Part\s*(\d+)[\.:]\s*(.+)',  # Allow both colon and period
-            r'##\s*Problem\s*(\d+)[\.:]\s*(.+)',  # Allow both colon and period
-            # r'____',
-            # r'---'  # Separator pattern from your example
-        ]
         self.id_manager = id_manager
         self.use_anonymization = use_anonymization
+        # abspath -> ((mtime_ns, size), (problems, responses, total_cells))
+        self._parse_cache = {}
+        self._parse_cache_lock = threading.Lock()  # parse_notebook is called from grading threads
     
     def parse_notebook(self, notebook_path: str) -> Dict[str, Any]:
         """Parse notebook and extract structured problem-response pairs"""
         
-        with open(notebook_path, 'r', encoding='utf-8') as file:
-            notebook = nbformat.read(file, as_version=4)
+        # Problems and responses depend only on the file, so reuse them while it is unchanged
+        stat = os.stat(notebook_path)
+        cache_key = os.path.abspath(notebook_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._parse_cache_lock:
+            cached = self._parse_cache.get(cache_key)
+        if cached is not None and cached[0] == version:
+            problems, responses, total_cells = cached[1]
+        else:
+            # Shared (cached) raw parse; the completion grader reads the same cells
+            notebook = {'cells': read_notebook_cells(notebook_path)}
+            problems = self._identify_problems(notebook)
+            responses = self._extract_responses(notebook, problems)
+            total_cells = len(notebook['cells'])
+            with self._parse_cache_lock:
+                if cache_key not in self._parse_cache and len(self._parse_cache) >= PARSE_CACHE_SIZE:
+                    del self._parse_cache[next(iter(self._parse_cache))]
+                self._parse_cache[cache_key] = (version, (problems, responses, total_cells))
         
         # Extract real name from filename
         real_student_name = self._extract_student_name(notebook_path)
@@ -39,17 +80,14 @@ class NotebookParser:
         else:
             student_identifier = real_student_name
         
-        problems = self._identify_problems(notebook)
-        responses = self._extract_responses(notebook, problems)
-        
         return {
             'student_name': student_identifier,  # This could be real name or anonymous ID
             'student_id': student_identifier,    # New field for consistency
             'real_name': real_student_name,      # Always store real name for mapping
             'notebook_path': notebook_path,
-            'problems': problems,
-            'responses': responses,
-            'total_cells': len(notebook['cells']),
+            'problems': list(problems),
+            'responses': list(responses),
+            'total_cells': total_cells,
             'anonymized': self.use_anonymization
         }
     
@@ -68,9 +106,9 @@ class NotebookParser:
             if cell['cell_type'] == 'markdown':
                 content = cell['source']
                 
-                # Check for problem patterns
-                for pattern in self.problem_patterns:
-                    match = re.search(pattern, content, re.IGNORECASE)
+                # Check for problem headings
+                for pattern in _PROBLEM_HEADING_RES:
+                    match = pattern.search(content)
                     if match:
                         problem_info = {
                             'cell_index': i,
@@ -101,6 +139,7 @@ class NotebookParser:
     def _extract_responses(self, notebook, problems: List[Dict]) -> List[StudentResponse]:
         """Extract student responses following each problem"""
         responses = []
+        n_cells = len(notebook['cells'])
         
         for i, problem in enumerate(problems):
             problem_start = problem['cell_index']
@@ -109,7 +148,7 @@ class NotebookParser:
             if i + 1 < len(problems):
                 problem_end = problems[i + 1]['cell_index']
             else:
-                problem_end = len(notebook['cells'])
+                problem_end = n_cells
             
             # Extract and combine all response cells in this problem section
             combined_response = self._get_combined_response_in_range(
@@ -124,48 +163,48 @@ class NotebookParser:
     def _get_combined_response_in_range(self, notebook, start: int, end: int, problem_id: str) -> Optional[StudentResponse]:
         """Extract and combine all response cells between start and end cell indices into a single StudentResponse"""
         
-        answer_cells = []
         combined_content = []
         combined_output = []
         has_errors = False
         first_cell_index = start
+        code_count = 0
+        markdown_count = 0
+        found_any = False
+        cells = notebook['cells']
         
-        for i in range(start, end):
-            if i >= len(notebook['cells']):
-                break
-                
-            cell = notebook['cells'][i]
+        for i in range(start, min(end, len(cells))):
+            cell = cells[i]
             
             # Check if this is an answer cell
             if self._is_answer_cell(cell):
-                answer_cells.append(cell)
+                cell_type = cell['cell_type']
+                
+                # Use the first answer cell's index as the reference
+                if not found_any:
+                    first_cell_index = i
+                    found_any = True
+                
+                # Tally cell types for the dominant type below
+                if cell_type == 'code':
+                    code_count += 1
+                elif cell_type == 'markdown':
+                    markdown_count += 1
                 
                 # Combine content with cell type indicators
-                cell_type_indicator = f"[{cell['cell_type'].upper()} CELL]"
+                cell_type_indicator = f"[{cell_type.upper()} CELL]"
                 combined_content.append(f"{cell_type_indicator}\n{cell['source']}")
                 
-                # Collect execution output if available
-                output = self._get_execution_output(cell)
+                # Collect execution output if available, and check for errors
+                output, cell_has_errors = self._get_execution_output(cell)
                 if output:
                     combined_output.append(f"[OUTPUT from cell {i}]\n{output}")
-                
-                # Check for errors
-                if self._check_for_errors(cell):
+                if cell_has_errors:
                     has_errors = True
-                
-                # Use the first answer cell's index as the reference
-                if len(answer_cells) == 1:
-                    first_cell_index = i
         
         # If no answer cells found, return None
-        if not answer_cells:
+        if not found_any:
             return None
         
-        # Determine the dominant cell type (markdown vs code)
-        cell_types = [cell['cell_type'] for cell in answer_cells]
-        code_count = cell_types.count('code')
-        markdown_count = cell_types.count('markdown')
-        
         # Classify as mixed if both types present, otherwise use the majority
         if code_count > 0 and markdown_count > 0:
             dominant_type = 'mixed'
@@ -188,98 +227,82 @@ class NotebookParser:
     def _is_answer_cell(self, cell) -> bool:
         """Determine if a cell contains a student answer"""
         # Check for answer tags
-        tags = cell.get('metadata', {}).get('tags', [])
-        if 'code answer' in tags or 'text answer' in tags:
+        tags = cell.get('metadata', {}).get('tags')
+        if tags and ('code answer' in tags or 'text answer' in tags):
             return True
         
         # Check for substantial content
         content = cell['source'].strip()
         if not content:
             return False
+        
+        cell_type = cell['cell_type']
             
         # For code cells, check if there's actual code (not just comments)
-        if cell['cell_type'] == 'code':
-            non_comment_lines = [line for line in content.split('\n') 
-                               if line.strip() and not line.strip().startswith('#')]
-            return len(non_comment_lines) > 0
+        if cell_type == 'code':
+            return any((stripped := line.strip()) and not stripped.startswith('#')
+                       for line in content.split('\n'))
         
         # For markdown cells, check for answer indicators or substantial content
-        if cell['cell_type'] == 'markdown':
-            # Skip cells that are just problem statements (look for common problem indicators)
-            problem_indicators = ['##', '(10)', '(20)', '(30)', '(40)', 'points)', '---']
-            if any(indicator in content for indicator in problem_indicators):
-                # This might be a problem statement, check if it's mainly that
-                if len(content.split('\n')) <= 5 and any(indicator in content[:100] for indicator in problem_indicators):
-                    return False
-            
-            # Look for answer indicators
-            answer_indicators = ['answer:', '**answer:**', 'solution:', 'response:', '###', 'interpretation:', 'why these help:']
-            content_lower = content.lower()
-            if any(indicator in content_lower for indicator in answer_indicators):
-                return True
+        if cell_type == 'markdown':
+            # Skip short cells that open like a problem statement (common problem indicators
+            # in the first 100 chars); the line count is the cheaper test so it goes first
+            if content.count('\n') < 5 and _PROBLEM_INDICATOR_RE.search(content, 0, 100):
+                return False
             
-            # Include substantial markdown content that's not obviously a problem statement
-            return len(content) > 50
+            # Include substantial markdown content that's not obviously a problem statement;
+            # shorter cells count only if they carry an answer indicator
+            return len(content) > 50 or _ANSWER_INDICATOR_RE.search(content) is not None
         
         return True  # Default to including non-empty cells
     
-    def _get_execution_output(self, cell) -> Optional[str]:
-        """Extract execution output from code cells, including images"""
+    def _get_execution_output(self, cell) -> Tuple[Optional[str], bool]:
+        """Extract execution output from code cells, including images, and whether execution errored"""
         if cell['cell_type'] != 'code':
-            return None
+            return None, False
             
         outputs = cell.get('outputs', [])
         if not outputs:
-            return None
+            return None, False
         
         output_components = []
+        has_errors = False
         
         for i, output in enumerate(outputs):
             output_type = output.get('output_type', 'unknown')
+            text = output.get('text')
+            data = output.get('data')
+            
+            if output_type == 'error':
+                has_errors = True
             
             # Handle text outputs
-            if 'text' in output:
-                text_data = output['text']
-                if isinstance(text_data, list):
-                    text_content = ''.join(text_data)
-                else:
-                    text_content = str(text_data)
+            if text is not None:
+                text_content = _as_text(text)
                 if text_content.strip():
                     output_components.append(f"[TEXT OUTPUT {i+1}]\n{text_content}")
             
             # Handle data outputs (including images)
-            elif 'data' in output:
-                data = output['data']
-                
+            elif data is not None:
                 # Text/plain data
                 if 'text/plain' in data:
-                    plain_data = data['text/plain']
-                    if isinstance(plain_data, list):
-                        text_content = ''.join(plain_data)
-                    else:
-                        text_content = str(plain_data)
+                    text_content = _as_text(data['text/plain'])
                     if text_content.strip():
                         output_components.append(f"[PLAIN TEXT OUTPUT {i+1}]\n{text_content}")
                 
                 # Image data (PNG, JPEG, SVG)
-                image_formats = ['image/png', 'image/jpeg', 'image/svg+xml']
-                for img_format in image_formats:
+                for img_format in _IMAGE_FORMATS:
                     if img_format in data:
                         # For images, we'll include metadata about the image
                         img_info = f"[IMAGE OUTPUT {i+1}]\nFormat: {img_format}\n"
                         
                         # Try to get image size if available
                         if img_format == 'image/svg+xml':
-                            svg_data = data[img_format]
-                            if isinstance(svg_data, list):
-                                svg_content = ''.join(svg_data)
-                            else:
-                                svg_content = str(svg_data)
+                            svg_content = _as_text(data[img_format])
                             
                             # Extract SVG dimensions if present
-                            import re
-                            width_match = re.search(r'width=["\']?(\d+(?:\.\d+)?)', svg_content)
-                            height_match = re.search(r'height=["\']?(\d+(?:\.\d+)?)', svg_content)
+                            width_match = _SVG_WIDTH_RE.search(svg_content)
+                            height_match = _SVG_HEIGHT_RE.search(svg_content)
                             
                             if width_match and height_match:
                                 img_info += f"Dimensions: {width_match.group(1)} x {height_match.group(1)}\n"
@@ -293,8 +316,9 @@ class NotebookParser:
                             # For PNG/JPEG, we can't easily extract dimensions without decoding
                             # But we can note the presence and format
                             img_data = data[img_format]
-                            if isinstance(img_data, str):
-                                data_size = len(img_data)
+                            # read_notebook_cells keeps only the length of base64 strings
+                            if isinstance(img_data, (str, int)):
+                                data_size = img_data if isinstance(img_data, int) else len(img_data)
                                 img_info += f"Data size: ~{data_size} characters (base64 encoded)\n"
                             
                             # Add a note about what this represents
@@ -305,11 +329,7 @@ class NotebookParser:
                 
                 # HTML outputs (sometimes used for rich displays)
                 if 'text/html' in data:
-                    html_data = data['text/html']
-                    if isinstance(html_data, list):
-                        html_content = ''.join(html_data)
-                    else:
-                        html_content = str(html_data)
+                    html_content = _as_text(data['text/html'])
                     
                     # Include HTML but truncate if very long
                     if len(html_content) > 1000:
@@ -320,25 +340,9 @@ class NotebookParser:
                     output_components.append(f"[HTML OUTPUT {i+1}]\n{html_preview}")
             
             # Handle execution results (like the last expression in a cell)
-            elif output_type == 'execute_result' and 'data' in output:
-                data = output['data']
+            elif output_type == 'execute_result' and data is not None:
                 if 'text/plain' in data:
-                    result_data = data['text/plain']
-                    if isinstance(result_data, list):
-                        result_content = ''.join(result_data)
-                    else:
-                        result_content = str(result_data)
+                    result_content = _as_text(data['text/plain'])
                     output_components.append(f"[EXECUTION RESULT {i+1}]\n{result_content}")
         
-        return '\n\n'.join(output_components) if output_components else None
-    
-    def _check_for_errors(self, cell) -> bool:
-        """Check if cell execution resulted in errors"""
-        if cell['cell_type'] != 'code':
-            return False
-            
-        outputs = cell.get('outputs', [])
-        for output in outputs:
-            if output.get('output_type') == 'error':
-                return True
-        return False
\ No newline at end of file
+        return ('\n\n'.join(output_components) if output_components else None), has_errors
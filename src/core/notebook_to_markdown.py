@@ -1,23 +1,27 @@
-import nbformat
 import sys
 from pathlib import Path
 
+# Works both as part of the src.core package and as a standalone script
+try:
+    from .notebook_io import read_notebook_cells
+except ImportError:
+    from notebook_io import read_notebook_cells
+
 def notebook_to_markdown(ipynb_path, md_path):
-    # Load the notebook
-    with open(ipynb_path, "r", encoding="utf-8") as f:
-        nb = nbformat.read(f, as_version=4)
+    # Load the notebook cells (plain JSON parse; no nbformat validation needed here)
+    cells = read_notebook_cells(str(ipynb_path))
     
     md_lines = []
 
-    for cell in nb.cells:
-        if cell.cell_type == "markdown":
+    for cell in cells:
+        if cell["cell_type"] == "markdown":
             # Just append markdown as-is
-            md_lines.append(cell.source)
+            md_lines.append(cell["source"])
             md_lines.append("")  # blank line for separation
-        elif cell.cell_type == "code":
+        elif cell["cell_type"] == "code":
             # Format code cells
             md_lines.append("```python")
-            md_lines.append(cell.source)
+            md_lines.append(cell["source"])
             md_lines.append("```")
             md_lines.append("")  # blank line for separation
 
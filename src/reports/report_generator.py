@@ -138,22 +138,11 @@ class ReportGenerator:
                     'Feedback': result.feedback[:100] + "..." if len(result.feedback) > 100 else result.feedback
                 })
 
-def create_combined_report(directory_path: str, traditional_csv: str, 
-                         ai_results: Dict, assignment_id: str, mode: str = "homework"):
-    """Create a combined HTML report showing both traditional and AI grading"""
-    
-    # Load ICAs results
-    traditional_results = {}
-    traditional_csv_path = os.path.join(directory_path, os.path.basename(traditional_csv))
+def _combined_report_chunks(traditional_results: Dict, ai_results: Dict, 
+                            assignment_id: str, mode: str):
+    """Yield the combined HTML report piece by piece so it can be streamed to disk"""
     
-    if os.path.exists(traditional_csv_path):
-        with open(traditional_csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                traditional_results[row['Student Name']] = row
-    
-    # Create HTML report
-    html_content = f"""
+    yield f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -295,7 +284,7 @@ def create_combined_report(directory_path: str, traditional_csv: str,
                           for result in results if result.flagged_for_review)
     
     # Add summary cards
-    html_content += f"""
+    yield f"""
     <div class="summary-cards">
         <div class="card">
             <h3>Total Students</h3>
@@ -317,14 +306,14 @@ def create_combined_report(directory_path: str, traditional_csv: str,
     
     # Add grading method info based on mode
     if mode == 'ica':
-        html_content += f"""
+        yield f"""
             <div class="metric-label">Traditional: Completion-based</div>
             <div class="metric-label">AI: Content-based</div>"""
     else:  # homework mode
-        html_content += f"""
+        yield f"""
             <div class="metric-label">AI: Content-based with rubric</div>"""
     
-    html_content += f"""
+    yield f"""
         </div>
     </div>
 """
@@ -341,7 +330,7 @@ def create_combined_report(directory_path: str, traditional_csv: str,
         # Get ICAs data
         traditional_data = traditional_results.get(student_name, {})
         
-        html_content += f"""
+        yield f"""
     <div class="student-section">
         <div class="student-header" onclick="toggleStudent({student_id})">
             <h3>{student_name}
@@ -353,7 +342,7 @@ def create_combined_report(directory_path: str, traditional_csv: str,
         
         # Add traditional grade section only for ICA mode
         if mode == 'ica':
-            html_content += f"""
+            yield f"""
                 <div class="traditional-grade">
                     <h4>ICAs (Completion)</h4>
                     <p><strong>Final Grade:</strong> {traditional_data.get('Final Grade', 'N/A')}/4</p>
@@ -363,7 +352,7 @@ def create_combined_report(directory_path: str, traditional_csv: str,
                     <p><strong>Missing Answers:</strong> {traditional_data.get('Missing Answers Count', 'N/A')}</p>
                 </div>"""
         
-        html_content += f"""
+        yield f"""
                 <div class="ai-grade">
                     <h4>AI Grading (Content Quality)</h4>
 """
@@ -373,7 +362,7 @@ def create_combined_report(directory_path: str, traditional_csv: str,
         total_ai_possible = sum(result.max_possible for result in ai_student_results)
         avg_confidence = sum(result.confidence for result in ai_student_results) / len(ai_student_results)
         
-        html_content += f"""
+        yield f"""
                     <p><strong>Total Score:</strong> {total_ai_score:.1f}/{total_ai_possible} ({(total_ai_score/total_ai_possible*100):.1f}%)</p>
                     <p><strong>Average Confidence:</strong> {avg_confidence:.2f}</p>
                     <p><strong>Problems Graded:</strong> {len(ai_student_results)}</p>
@@ -384,7 +373,7 @@ def create_combined_report(directory_path: str, traditional_csv: str,
         # Show flagged items
         flagged_items = [r for r in ai_student_results if r.flagged_for_review]
         if flagged_items:
-            html_content += f"""
+            yield f"""
             <div class="flagged">
                 <strong>⚠️ Flagged for Review:</strong> {len(flagged_items)} problem(s) need manual verification
             </div>
@@ -392,7 +381,7 @@ def create_combined_report(directory_path: str, traditional_csv: str,
         
         # Add detailed AI results for each problem
         for result in ai_student_results:
-            html_content += f"""
+            yield f"""
             <h4>Problem: {result.problem_id}</h4>
             <p><strong>Score:</strong> {result.total_score}/{result.max_possible} ({result.percentage:.1f}%) | 
                <strong>Confidence:</strong> {result.confidence:.2f}</p>
@@ -404,29 +393,43 @@ def create_combined_report(directory_path: str, traditional_csv: str,
 """
             
             if result.suggestions:
-                html_content += f"""
+                yield f"""
             <div class="suggestions">
                 <strong>Suggestions for Improvement:</strong>
                 <ul>
 """
                 for suggestion in result.suggestions:
-                    html_content += f"<li>{suggestion}</li>"
-                html_content += """
+                    yield f"<li>{suggestion}</li>"
+                yield """
                 </ul>
             </div>
 """
         
-        html_content += """
+        yield """
         </div>
     </div>
 """
     
-    html_content += """
+    yield """
 </body>
 </html>
 """
+
+def create_combined_report(directory_path: str, traditional_csv: str, 
+                         ai_results: Dict, assignment_id: str, mode: str = "homework"):
+    """Create a combined HTML report showing both traditional and AI grading"""
+    
+    # Load ICAs results
+    traditional_results = {}
+    traditional_csv_path = os.path.join(directory_path, os.path.basename(traditional_csv))
+    
+    if os.path.exists(traditional_csv_path):
+        with open(traditional_csv_path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                traditional_results[row['Student Name']] = row
     
-    # Save HTML report
+    # Stream the HTML report to disk section by section instead of building it in memory
     report_path = os.path.join(directory_path, 'combined_grading_report.html')
     with open(report_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
\ No newline at end of file
+        f.writelines(_combined_report_chunks(traditional_results, ai_results, assignment_id, mode))
\ No newline at end of file
@@ -4,7 +4,6 @@ Rubric management system for handling grading criteria and scoring
 """
 
 import os
-import yaml
 from typing import Dict
 from ..config.data_structures import GradingCriterion, ProblemRubric
 
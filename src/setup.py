@@ -6,41 +6,42 @@ Simple setup script for the modular AI grading system
 import os
 import yaml
 
+# Default configuration written by create_config_file()
+_DEFAULT_CONFIG = {
+    'llm_settings': {
+        'provider': 'mock',  # Change to 'openai' or 'anthropic' when ready
+        'model': 'gpt-4',
+        'api_key': 'your_api_key_here',
+        'max_tokens': 1500,
+        'temperature': 0.3
+    },
+    'grading_settings': {
+        'confidence_threshold': 0.7,
+        'auto_flag_low_confidence': True,
+        'enable_detailed_feedback': True,
+        'max_suggestions': 5
+    },
+    'output_settings': {
+        'generate_html_report': True,
+        'export_detailed_feedback': True,
+        'create_flagged_report': True,
+        'save_grading_history': True
+    },
+    'system_settings': {
+        'rubrics_directory': 'rubrics',
+        'output_directory': 'ai_grading_results',
+        'log_level': 'INFO'
+    }
+}
+
 def create_config_file():
     """Create a basic configuration file"""
     
-    config = {
-        'llm_settings': {
-            'provider': 'mock',  # Change to 'openai' or 'anthropic' when ready
-            'model': 'gpt-4',
-            'api_key': 'your_api_key_here',
-            'max_tokens': 1500,
-            'temperature': 0.3
-        },
-        'grading_settings': {
-            'confidence_threshold': 0.7,
-            'auto_flag_low_confidence': True,
-            'enable_detailed_feedback': True,
-            'max_suggestions': 5
-        },
-        'output_settings': {
-            'generate_html_report': True,
-            'export_detailed_feedback': True,
-            'create_flagged_report': True,
-            'save_grading_history': True
-        },
-        'system_settings': {
-            'rubrics_directory': 'rubrics',
-            'output_directory': 'ai_grading_results',
-            'log_level': 'INFO'
-        }
-    }
-    
     os.makedirs('config', exist_ok=True)
     config_path = 'config/config.yaml'
     
     with open(config_path, 'w') as f:
-        yaml.dump(config, f, default_flow_style=False, indent=2)
+        yaml.dump(_DEFAULT_CONFIG, f, default_flow_style=False, indent=2)
     
     print(f"✓ Created configuration file: {config_path}")
 
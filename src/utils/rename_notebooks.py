@@ -1,5 +1,6 @@
 import os
 import sys
+import shutil
 import argparse
 
 def rename_notebooks(directory, target_directory=None):
@@ -31,7 +32,8 @@ def rename_notebooks(directory, target_directory=None):
         return [], target_directory
 
     # Get list of notebook files
-    notebook_files = [f for f in os.listdir(directory) if f.endswith(".ipynb")]
+    with os.scandir(directory) as entries:
+        notebook_files = [entry.name for entry in entries if entry.name.endswith(".ipynb") and entry.is_file()]
     
     if not notebook_files:
         print(f"No Jupyter notebooks found in '{directory}'")
@@ -43,8 +45,8 @@ def rename_notebooks(directory, target_directory=None):
     for filename in notebook_files:
         print(f"Processing: {filename}")
         
-        # Split the filename on the dash and strip any leading/trailing spaces
-        parts = filename.split(" - ")
+        # Split the filename on the dash (only the name segment is needed, so stop after two splits)
+        parts = filename.split(" - ", 2)
         
         if len(parts) >= 3:  # Check if the filename format is correct
             person_name = parts[1].strip()
@@ -65,9 +67,8 @@ def rename_notebooks(directory, target_directory=None):
                 new_file_path = os.path.join(target_directory, new_filename)
                 
                 try:
-                    # Copy the file to new location with new name
-                    import shutil
-                    shutil.copy2(old_file_path, new_file_path)
+                    # Copy the file contents to new location with new name (metadata isn't needed)
+                    shutil.copyfile(old_file_path, new_file_path)
                     renamed_files.append((filename, new_filename))
                     print(f"  ✓ Renamed '{filename}' to '{new_filename}'")
                 except Exception as e:
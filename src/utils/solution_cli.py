@@ -6,36 +6,59 @@ Command-line interface for the Solution Generator module
 import sys
 import os
 import argparse
+from typing import Dict, List
 from ..config.config_manager import ConfigManager, LLMFactory
-from .solution_generator import SolutionGenerator
+from .solution_generator import SolutionGenerator, ProblemSolution
 from ..ai_grading.enhanced_grading_agent import EnhancedAIGradingAgent
 
-def generate_solutions_for_assignment(assignment_id: str, output_dir: str = None):
+# Where generated solutions' LLM replies are cached between runs
+SOLUTION_CACHE_DIRECTORY = "~/.cache/ai_grader"
+
+def generate_solutions_for_assignment(assignment_id: str, output_dir: str = None, use_cache: bool = True):
     """Generate reference solutions for a specific assignment"""
+    return generate_solutions_for_assignments([assignment_id], output_dir, use_cache)[assignment_id]
+
+def generate_solutions_for_assignments(assignment_ids: List[str], output_dir: str = None, use_cache: bool = True):
+    """Generate reference solutions for several assignments, solving problems they share only once"""
     
-    print(f"🧠 Generating reference solutions for: {assignment_id}")
+    print(f"🧠 Generating reference solutions for: {', '.join(assignment_ids)}")
     
     # Initialize components
     config = ConfigManager()
     llm = LLMFactory.create_llm(config)
-    solution_generator = SolutionGenerator(llm, temperature=0.7)  # Higher temp for creativity
+    solution_generator = SolutionGenerator(  # Higher temp for creativity
+        llm, temperature=0.7, cache_directory=SOLUTION_CACHE_DIRECTORY if use_cache else None
+    )
     
     # Generate solutions
-    solutions = solution_generator.generate_assignment_solutions(assignment_id)
+    all_solutions = solution_generator.generate_solutions_for_assignments(assignment_ids)
     
-    # Export solutions
-    if not output_dir:
-        output_dir = f"reference_solutions/{assignment_id}"
+    for assignment_id, solutions in all_solutions.items():
+        if len(all_solutions) > 1:
+            print(f"\n📚 {assignment_id}")
+        
+        # Export solutions (one subdirectory per assignment when several share an output directory)
+        if not output_dir:
+            assignment_output_dir = f"reference_solutions/{assignment_id}"
+        elif len(all_solutions) > 1:
+            assignment_output_dir = os.path.join(output_dir, assignment_id)
+        else:
+            assignment_output_dir = output_dir
+        
+        solution_generator.export_solutions(solutions, assignment_output_dir)
+        print_solution_quality(solution_generator, solutions)
     
-    solution_generator.export_solutions(solutions, output_dir)
+    return all_solutions
+
+def print_solution_quality(solution_generator: SolutionGenerator, solutions: Dict[str, ProblemSolution]):
+    """Evaluate solutions and print a quality report"""
     
     # Quality assessment
     print(f"\n📊 Solution Quality Assessment:")
     print("-" * 40)
     
     total_quality = 0
-    for problem_id, solution in solutions.items():
-        quality = solution_generator.evaluate_solution_quality(solution)
+    for problem_id, quality in solution_generator.evaluate_solutions_quality(solutions).items():
         total_quality += quality.overall_score
         
         status = "✅" if quality.overall_score >= 0.8 else "⚠️" if quality.overall_score >= 0.6 else "❌"
@@ -58,8 +81,6 @@ def generate_solutions_for_assignment(assignment_id: str, output_dir: str = None
         print("👀 Good quality, but consider reviewing flagged solutions.")
     else:
         print("🔍 Consider regenerating solutions or manual review.")
-    
-    return solutions
 
 def grade_with_solutions(directory_path: str, assignment_id: str):
     """Grade notebooks using reference solutions"""
@@ -184,7 +205,7 @@ def view_reference_solution(assignment_id: str, problem_id: str = None):
     
     config = ConfigManager()
     llm = LLMFactory.create_llm(config)
-    solution_generator = SolutionGenerator(llm)
+    solution_generator = SolutionGenerator(llm, cache_directory=SOLUTION_CACHE_DIRECTORY)
     
     # Generate solutions if needed
     solutions = solution_generator.generate_assignment_solutions(assignment_id)
@@ -228,6 +249,7 @@ def main():
 Examples:
   # Generate reference solutions
   python solution_cli.py generate hw2_california_housing
+  python solution_cli.py generate hw2_california_housing hw3_regression  # Shared problems solved once
   
   # Grade with reference solutions
   python solution_cli.py grade HW02_renamed hw2_california_housing
@@ -245,8 +267,11 @@ Examples:
     
     # Generate solutions command
     generate_parser = subparsers.add_parser('generate', help='Generate reference solutions')
-    generate_parser.add_argument('assignment_id', help='Assignment identifier')
+    generate_parser.add_argument('assignment_ids', nargs='+', metavar='assignment_id',
+                                 help='Assignment identifier(s); problems shared between them are solved once')
     generate_parser.add_argument('--output', '-o', help='Output directory')
+    generate_parser.add_argument('--no-cache', action='store_true',
+                                 help='Regenerate solutions instead of reusing cached LLM replies')
     
     # Grade with solutions command  
     grade_parser = subparsers.add_parser('grade', help='Grade notebooks with reference solutions')
@@ -272,7 +297,7 @@ Examples:
     
     try:
         if args.command == 'generate':
-            generate_solutions_for_assignment(args.assignment_id, args.output)
+            generate_solutions_for_assignments(args.assignment_ids, args.output, use_cache=not args.no_cache)
         
         elif args.command == 'grade':
             grade_with_solutions(args.directory, args.assignment_id)
@@ -6,15 +6,91 @@ Generates reference solutions to aid in grading and rubric development
 
 import json
 import os
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, replace
 from datetime import datetime
 
-from ..ai_grading.llm_interface import LLMInterface
+# orjson is optional; it serializes and parses JSON several times faster than the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from ..ai_grading.llm_interface import LLMInterface, CachedLLM, MockLLM
 from ..config.data_structures import ProblemRubric
 from ..reports.rubric_manager import RubricManager
 
-@dataclass
+# One '"key": ' step through a JSON object's fields (the value is decoded separately)
+_JSON_FIELD_RE = re.compile(r'\s*,?\s*("(?:[^"\\]|\\.)*")\s*:\s*')
+# Braces and (possibly unterminated) string literals, for finding where a JSON object really ends
+_JSON_SCAN_RE = re.compile(r'[{}]|"(?:[^"\\]|\\.)*"?')
+_JSON_DECODER = json.JSONDecoder()
+
+# Fields a solution reply must contain to count as complete (see _construct_solution_prompt)
+_SOLUTION_FIELDS = ('solution_code', 'solution_explanation', 'key_concepts', 'expected_outputs',
+                    'common_approaches', 'grading_notes', 'difficulty_level', 'estimated_time_minutes')
+
+def _find_json_object(text: str) -> Tuple[int, int]:
+    """Span of the first balanced {...} in text; end is -1 if the object never closes (start -1 if none)"""
+    start = text.find('{')
+    if start == -1:
+        return -1, -1
+    
+    # One pass over braces and whole string literals, so braces inside strings don't count
+    depth = 0
+    for token in _JSON_SCAN_RE.finditer(text, start):
+        if token[0] == '{':
+            depth += 1
+        elif token[0] == '}':
+            depth -= 1
+            if depth == 0:
+                return start, token.end()
+    return start, -1
+
+def _parse_json_object(text: str) -> Tuple[Dict[str, Any], bool]:
+    """Parse the JSON object in an LLM reply, salvaging the complete fields of a truncated one.
+    
+    Returns the fields and whether the object was parsed whole (False when fields were salvaged).
+    """
+    json_start, json_end = _find_json_object(text)
+    if json_start == -1:
+        raise ValueError("No JSON found in LLM response")
+    
+    try:
+        if json_end == -1:
+            raise json.JSONDecodeError("Unterminated JSON object", text, len(text))
+        if orjson is not None:
+            return orjson.loads(text[json_start:json_end]), True
+        return json.loads(text[json_start:json_end]), True
+    except json.JSONDecodeError:  # orjson.JSONDecodeError is a subclass
+        # Replies cut off at max_tokens never close the object; keep every field that came through whole
+        fields = {}
+        pos = json_start + 1
+        while (match := _JSON_FIELD_RE.match(text, pos)):
+            try:
+                value, pos = _JSON_DECODER.raw_decode(text, match.end())
+            except ValueError:
+                break
+            fields[json.loads(match.group(1))] = value
+        
+        # In a cut-off reply, a last value that runs to the end of the text may itself be cut short
+        # (e.g. 25 read as 2); one followed by a comma is known to be whole
+        if json_end == -1 and fields and not text[pos:].strip():
+            fields.popitem()
+        
+        if not fields:
+            raise
+        return fields, False
+
+def _is_truncated_json(text: str) -> bool:
+    """Whether a reply starts a JSON object but ends before closing it (e.g. cut off at max_tokens)"""
+    json_start, json_end = _find_json_object(text)
+    return json_start != -1 and json_end == -1
+
+@dataclass(frozen=True)
 class ProblemSolution:
     """Generated solution for a specific problem"""
     problem_id: str
@@ -28,8 +104,9 @@ class ProblemSolution:
     difficulty_level: str  # 'easy', 'medium', 'hard'
     estimated_time_minutes: int
     generated_timestamp: datetime
+    is_complete: bool = True  # False for fallbacks and replies missing fields; those are never cached
 
-@dataclass
+@dataclass(frozen=True)
 class SolutionQuality:
     """Assessment of solution quality and completeness"""
     completeness_score: float  # 0.0 to 1.0
@@ -42,25 +119,42 @@ class SolutionQuality:
 class SolutionGenerator:
     """Generates reference solutions for assignment problems using LLM"""
     
-    def __init__(self, llm_interface: LLMInterface, temperature: float = 0.7):
+    def __init__(self, llm_interface: LLMInterface, temperature: float = 0.7,
+                 cache_directory: Optional[str] = None):
+        # With a cache_directory, LLM replies are reused across runs, so viewing or regrading doesn't
+        # regenerate every solution (AI_GRADER_NO_CACHE=1 still forces fresh calls); off by default
+        if (cache_directory and os.environ.get('AI_GRADER_NO_CACHE') != '1'
+                and not isinstance(llm_interface, (MockLLM, CachedLLM))):
+            llm_interface = CachedLLM(llm_interface, cache_directory, key_prefix=f"solutions|temperature={temperature}")
         self.llm = llm_interface
         self.temperature = temperature  # Higher temperature for creative problem solving
         self.rubric_manager = RubricManager()
-        self.solutions_cache = {}
+        self.solutions_cache = {}  # _solution_key(...) -> ProblemSolution
     
     def generate_solution(self, problem_statement: str, rubric: ProblemRubric, 
-                         assignment_context: str = "") -> ProblemSolution:
-        """Generate a comprehensive solution for a given problem"""
+                         assignment_context: str = "", max_tokens: int = 1200) -> ProblemSolution:
+        """Generate a comprehensive solution for a given problem.
+        
+        Most solutions fit in max_tokens; a reply cut off there is retried once with a 2000-token budget.
+        """
+        
+        # Reuse a solution already generated for exactly this problem and rubric
+        cache_key = self._solution_key(problem_statement, rubric, assignment_context)
+        cached = self.solutions_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         prompt = self._construct_solution_prompt(problem_statement, rubric, assignment_context)
         
         try:
-            llm_response = self.llm.generate_response(prompt, max_tokens=2000)
+            llm_response = self.llm.generate_response(prompt, max_tokens=max_tokens)
+            if max_tokens < 2000 and _is_truncated_json(llm_response):
+                llm_response = self.llm.generate_response(prompt, max_tokens=2000)
             solution = self._parse_solution_response(llm_response, rubric.problem_id, assignment_context)
             
-            # Cache the solution
-            cache_key = f"{assignment_context}_{rubric.problem_id}"
-            self.solutions_cache[cache_key] = solution
+            # Cache the solution (fallbacks and incomplete replies are retried next time)
+            if solution.is_complete:
+                self.solutions_cache[cache_key] = solution
             
             return solution
             
@@ -68,30 +162,171 @@ class SolutionGenerator:
             print(f"Error generating solution for {rubric.problem_id}: {e}")
             return self._create_fallback_solution(rubric.problem_id, assignment_context, str(e))
     
-    def generate_assignment_solutions(self, assignment_id: str) -> Dict[str, ProblemSolution]:
-        """Generate solutions for all problems in an assignment"""
+    @staticmethod
+    def _solution_key(problem_statement: str, rubric: ProblemRubric, assignment_context: str) -> tuple:
+        """Everything the solution prompt depends on, as a hashable cache key"""
+        return (
+            assignment_context,
+            rubric.problem_id,
+            problem_statement,
+            rubric.total_points,
+            rubric.expected_response_type,
+            tuple((crit.name, crit.description, crit.max_points) for crit in rubric.criteria)
+        )
+    
+    def generate_assignment_solutions(self, assignment_id: str, max_workers: Optional[int] = None,
+                                      batch_size: int = 1) -> Dict[str, ProblemSolution]:
+        """Generate solutions for all problems in an assignment, up to max_workers calls concurrently
+        (default: the LLM's max_concurrent_requests).
+        
+        With batch_size > 1, that many problems share each LLM call: fewer requests and prompt
+        tokens overall, but each call takes longer, so the default keeps one problem per call.
+        """
         
         print(f"Generating reference solutions for assignment: {assignment_id}")
         
         # Load assignment rubric
         assignment_rubric = self.rubric_manager.load_assignment_rubric(assignment_id)
         
-        solutions = {}
+        if not assignment_rubric:
+            return {}
+        
+        context = f"Assignment: {assignment_id}"
+        problem_ids = list(assignment_rubric)
+        batch_size = max(1, batch_size)
+        batches = [problem_ids[i:i + batch_size] for i in range(0, len(problem_ids), batch_size)]
         
-        for problem_id, rubric in assignment_rubric.items():
-            print(f"  Generating solution for {problem_id}...")
+        def generate(batch: List[str]) -> List[ProblemSolution]:
+            print(f"  Generating solution{'s' if len(batch) > 1 else ''} for {', '.join(batch)}...")
             
-            solution = self.generate_solution(
-                problem_statement=rubric.problem_statement,
-                rubric=rubric,
-                assignment_context=f"Assignment: {assignment_id}"
+            batch_solutions = self.generate_solutions_batch(
+                [(assignment_rubric[problem_id].problem_statement, assignment_rubric[problem_id]) for problem_id in batch],
+                assignment_context=context
             )
             
-            solutions[problem_id] = solution
-            print(f"    ✓ Solution generated ({solution.difficulty_level} difficulty)")
+            for problem_id, solution in zip(batch, batch_solutions):
+                print(f"    ✓ Solution generated for {problem_id} ({solution.difficulty_level} difficulty)")
+            return batch_solutions
+        
+        # Each call is independent and network-bound, so make them concurrently
+        solutions = {}
+        if max_workers is None:
+            max_workers = self.llm.max_concurrent_requests
+        workers = max(1, min(max_workers, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch, batch_solutions in zip(batches, executor.map(generate, batches)):
+                solutions.update(zip(batch, batch_solutions))
         
         return solutions
     
+    def generate_solutions_for_assignments(self, assignment_ids: List[str],
+                                           max_workers: Optional[int] = None) -> Dict[str, Dict[str, ProblemSolution]]:
+        """Generate solutions for several assignments, solving problems they share only once"""
+        
+        rubrics = {assignment_id: self.rubric_manager.load_assignment_rubric(assignment_id)
+                   for assignment_id in assignment_ids}
+        
+        # Group identical problems (same statement, points, response type and criteria) wherever they appear
+        groups = defaultdict(list)
+        for assignment_id, assignment_rubric in rubrics.items():
+            for problem_id, rubric in assignment_rubric.items():
+                signature = self._solution_key(rubric.problem_statement, rubric, "")[2:]
+                groups[signature].append((assignment_id, problem_id))
+        
+        print(f"Generating reference solutions for {len(rubrics)} assignments ({len(groups)} distinct problems)")
+        
+        def generate(positions: List[Tuple[str, str]]) -> ProblemSolution:
+            assignment_id, problem_id = positions[0]
+            print(f"  Generating solution for {problem_id} (used {len(positions)}x)...")
+            rubric = rubrics[assignment_id][problem_id]
+            return self.generate_solution(rubric.problem_statement, rubric, assignment_context=f"Assignment: {assignment_id}")
+        
+        # One call per distinct problem, then the same solution is filed under every position that shares it
+        by_position = {}
+        group_positions = list(groups.values())
+        if max_workers is None:
+            max_workers = self.llm.max_concurrent_requests
+        workers = max(1, min(max_workers, len(group_positions)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for positions, solution in zip(group_positions, executor.map(generate, group_positions)):
+                for assignment_id, problem_id in positions:
+                    by_position[assignment_id, problem_id] = replace(
+                        solution, problem_id=problem_id, assignment_id=f"Assignment: {assignment_id}"
+                    )
+        
+        return {
+            assignment_id: {problem_id: by_position[assignment_id, problem_id] for problem_id in assignment_rubric}
+            for assignment_id, assignment_rubric in rubrics.items()
+        }
+    
+    def generate_solutions_batch(self, items: List[Tuple[str, ProblemRubric]],
+                                 assignment_context: str = "") -> List[ProblemSolution]:
+        """Generate solutions for several problems with one LLM call, falling back to one call per problem"""
+        
+        # Problems solved before need no new call
+        solutions = [self.solutions_cache.get(self._solution_key(statement, rubric, assignment_context))
+                     for statement, rubric in items]
+        pending = [i for i, solution in enumerate(solutions) if solution is None]
+        
+        if len(pending) <= 1:
+            for i in pending:
+                solutions[i] = self.generate_solution(items[i][0], items[i][1], assignment_context)
+            return solutions
+        
+        # Each solution gets up to 2000 output tokens; split batches that would exceed the model's limit
+        per_call = max(1, self.llm.max_output_tokens // 2000)
+        if len(pending) > per_call:
+            for start in range(0, len(pending), per_call):
+                chunk = pending[start:start + per_call]
+                chunk_solutions = self.generate_solutions_batch([items[i] for i in chunk], assignment_context)
+                for i, solution in zip(chunk, chunk_solutions):
+                    solutions[i] = solution
+            return solutions
+        
+        pending_items = [items[i] for i in pending]
+        prompt = self._construct_batch_prompt(pending_items, assignment_context)
+        
+        try:
+            llm_response = self.llm.generate_response(prompt, max_tokens=2000 * len(pending_items))
+            
+            json_start = llm_response.find('[')
+            json_end = llm_response.rfind(']') + 1
+            if json_start == -1 or json_end == 0:
+                raise ValueError("No JSON array found in LLM response")
+            
+            parsed = json.loads(llm_response[json_start:json_end])
+            if not isinstance(parsed, list) or len(parsed) != len(pending_items) or not all(isinstance(p, dict) for p in parsed):
+                raise ValueError(f"Expected {len(pending_items)} solution objects")
+        except Exception as e:
+            print(f"Batch solution generation failed ({e}); generating {len(pending_items)} solutions individually")
+            for i in pending:
+                solutions[i] = self.generate_solution(items[i][0], items[i][1], assignment_context)
+            return solutions
+        
+        for i, generated in zip(pending, parsed):
+            statement, rubric = items[i]
+            solution = self._parse_solution_response(json.dumps(generated), rubric.problem_id, assignment_context)
+            if solution.is_complete:
+                self.solutions_cache[self._solution_key(statement, rubric, assignment_context)] = solution
+            solutions[i] = solution
+        
+        return solutions
+    
+    def _construct_batch_prompt(self, items: List[Tuple[str, ProblemRubric]], context: str) -> str:
+        """Combine individual solution prompts into one request that returns a JSON array"""
+        
+        sections = "\n\n".join(
+            f"=== PROBLEM {i} of {len(items)} ===\n{self._construct_solution_prompt(statement, rubric, context)}"
+            for i, (statement, rubric) in enumerate(items, 1)
+        )
+        
+        return f"""You will write reference solutions for {len(items)} independent problems. Each one below is a complete task with its own problem statement and grading criteria. Solve each one on its own.
+
+{sections}
+
+=== OUTPUT ===
+Return a JSON array with exactly {len(items)} objects, one per problem in the order given. Each object must use the JSON format requested in its problem."""
+    
     def _construct_solution_prompt(self, problem_statement: str, rubric: ProblemRubric, 
                                   context: str) -> str:
         """Construct prompt for generating problem solutions"""
@@ -148,14 +383,12 @@ Focus on creating a solution that demonstrates mastery of the concepts while bei
         
         try:
             # Extract JSON from response
-            json_start = llm_response.find('{')
-            json_end = llm_response.rfind('}') + 1
-            
-            if json_start == -1 or json_end == 0:
-                raise ValueError("No JSON found in LLM response")
+            parsed, parsed_whole = _parse_json_object(llm_response)
             
-            json_str = llm_response[json_start:json_end]
-            parsed = json.loads(json_str)
+            # A salvaged reply is usable for this run but is marked, and is_complete keeps it out of the cache
+            grading_notes = parsed.get('grading_notes', '')
+            if not parsed_whole:
+                grading_notes = f"[Partial reply: some fields were cut off or unreadable] {grading_notes}".rstrip()
             
             return ProblemSolution(
                 problem_id=problem_id,
@@ -165,10 +398,11 @@ Focus on creating a solution that demonstrates mastery of the concepts while bei
                 key_concepts=parsed.get('key_concepts', []),
                 expected_outputs=parsed.get('expected_outputs', ''),
                 common_approaches=parsed.get('common_approaches', []),
-                grading_notes=parsed.get('grading_notes', ''),
+                grading_notes=grading_notes,
                 difficulty_level=parsed.get('difficulty_level', 'medium'),
                 estimated_time_minutes=parsed.get('estimated_time_minutes', 60),
-                generated_timestamp=datetime.now()
+                generated_timestamp=datetime.now(),
+                is_complete=parsed_whole and all(field in parsed for field in _SOLUTION_FIELDS)
             )
             
         except (json.JSONDecodeError, KeyError, ValueError) as e:
@@ -189,9 +423,24 @@ Focus on creating a solution that demonstrates mastery of the concepts while bei
             grading_notes="Manual grading recommended due to solution generation failure",
             difficulty_level="unknown",
             estimated_time_minutes=0,
-            generated_timestamp=datetime.now()
+            generated_timestamp=datetime.now(),
+            is_complete=False
         )
     
+    def evaluate_solutions_quality(self, solutions: Dict[str, ProblemSolution],
+                                   max_workers: Optional[int] = None) -> Dict[str, SolutionQuality]:
+        """Evaluate several solutions, up to max_workers calls concurrently (default: the LLM's max_concurrent_requests)"""
+        
+        if not solutions:
+            return {}
+        
+        # Each evaluation depends only on its own solution, so none has to wait for another
+        if max_workers is None:
+            max_workers = self.llm.max_concurrent_requests
+        workers = max(1, min(max_workers, len(solutions)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(solutions, executor.map(self.evaluate_solution_quality, solutions.values())))
+    
     def evaluate_solution_quality(self, solution: ProblemSolution) -> SolutionQuality:
         """Evaluate the quality of a generated solution"""
         
@@ -225,9 +474,7 @@ Respond with JSON:
         
         try:
             response = self.llm.generate_response(prompt, max_tokens=500)
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            parsed = json.loads(response[json_start:json_end])
+            parsed, _ = _parse_json_object(response)
             
             return SolutionQuality(
                 completeness_score=parsed.get('completeness_score', 0.5),
@@ -254,56 +501,72 @@ Respond with JSON:
         os.makedirs(output_directory, exist_ok=True)
         
         # Export as JSON
-        solutions_data = {}
-        for problem_id, solution in solutions.items():
-            solutions_data[problem_id] = {
-                'problem_id': solution.problem_id,
-                'assignment_id': solution.assignment_id,
-                'solution_code': solution.solution_code,
-                'solution_explanation': solution.solution_explanation,
-                'key_concepts': solution.key_concepts,
-                'expected_outputs': solution.expected_outputs,
-                'common_approaches': solution.common_approaches,
-                'grading_notes': solution.grading_notes,
-                'difficulty_level': solution.difficulty_level,
-                'estimated_time_minutes': solution.estimated_time_minutes,
-                'generated_timestamp': solution.generated_timestamp.isoformat()
-            }
-        
         json_path = os.path.join(output_directory, 'reference_solutions.json')
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(solutions_data, f, indent=2, ensure_ascii=False)
-        
-        # Export human-readable versions
-        for problem_id, solution in solutions.items():
-            readable_path = os.path.join(output_directory, f'{problem_id}_solution.md')
-            with open(readable_path, 'w', encoding='utf-8') as f:
-                f.write(f"# Reference Solution: {problem_id}\n\n")
-                f.write(f"**Assignment:** {solution.assignment_id}\n")
-                f.write(f"**Difficulty:** {solution.difficulty_level}\n")
-                f.write(f"**Estimated Time:** {solution.estimated_time_minutes} minutes\n")
-                f.write(f"**Generated:** {solution.generated_timestamp}\n\n")
-                
-                f.write(f"## Solution Code\n\n```python\n{solution.solution_code}\n```\n\n")
-                
-                f.write(f"## Explanation\n\n{solution.solution_explanation}\n\n")
-                
-                f.write(f"## Key Concepts\n\n")
-                for concept in solution.key_concepts:
-                    f.write(f"- {concept}\n")
-                
-                f.write(f"\n## Expected Outputs\n\n{solution.expected_outputs}\n\n")
-                
-                f.write(f"## Common Approaches\n\n")
-                for approach in solution.common_approaches:
-                    f.write(f"- {approach}\n")
-                
-                f.write(f"\n## Grading Notes\n\n{solution.grading_notes}\n")
+        if orjson is not None:
+            # orjson serializes the dataclasses directly, with timestamps in isoformat()
+            with open(json_path, 'wb') as f:
+                f.write(orjson.dumps(solutions, option=orjson.OPT_INDENT_2))
+        else:
+            solutions_data = {}
+            for problem_id, solution in solutions.items():
+                solutions_data[problem_id] = {
+                    'problem_id': solution.problem_id,
+                    'assignment_id': solution.assignment_id,
+                    'solution_code': solution.solution_code,
+                    'solution_explanation': solution.solution_explanation,
+                    'key_concepts': solution.key_concepts,
+                    'expected_outputs': solution.expected_outputs,
+                    'common_approaches': solution.common_approaches,
+                    'grading_notes': solution.grading_notes,
+                    'difficulty_level': solution.difficulty_level,
+                    'estimated_time_minutes': solution.estimated_time_minutes,
+                    'generated_timestamp': solution.generated_timestamp.isoformat(),
+                    'is_complete': solution.is_complete
+                }
+            
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(solutions_data, f, indent=2, ensure_ascii=False)
+        
+        # Export human-readable versions; each file is independent, so write them concurrently
+        if solutions:
+            workers = max(1, min(16, len(solutions)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(
+                    lambda item: self._write_solution_markdown(output_directory, *item),
+                    solutions.items()
+                ))
         
         print(f"Solutions exported to: {output_directory}")
         print(f"  - JSON format: {json_path}")
         print(f"  - Markdown files: {len(solutions)} problem solutions")
     
+    def _write_solution_markdown(self, output_directory: str, problem_id: str, solution: ProblemSolution):
+        """Write the human-readable markdown version of one solution"""
+        
+        readable_path = os.path.join(output_directory, f'{problem_id}_solution.md')
+        with open(readable_path, 'w', encoding='utf-8') as f:
+            f.write(self._render_solution_markdown(problem_id, solution))
+    
+    def _render_solution_markdown(self, problem_id: str, solution: ProblemSolution) -> str:
+        """Render one solution as a markdown document"""
+        
+        concepts = ''.join(f"- {concept}\n" for concept in solution.key_concepts)
+        approaches = ''.join(f"- {approach}\n" for approach in solution.common_approaches)
+        
+        return (
+            f"# Reference Solution: {problem_id}\n\n"
+            f"**Assignment:** {solution.assignment_id}\n"
+            f"**Difficulty:** {solution.difficulty_level}\n"
+            f"**Estimated Time:** {solution.estimated_time_minutes} minutes\n"
+            f"**Generated:** {solution.generated_timestamp}\n\n"
+            f"## Solution Code\n\n```python\n{solution.solution_code}\n```\n\n"
+            f"## Explanation\n\n{solution.solution_explanation}\n\n"
+            f"## Key Concepts\n\n{concepts}"
+            f"\n## Expected Outputs\n\n{solution.expected_outputs}\n\n"
+            f"## Common Approaches\n\n{approaches}"
+            f"\n## Grading Notes\n\n{solution.grading_notes}\n"
+        )
+    
     def compare_student_solution(self, student_response: str, reference_solution: ProblemSolution) -> Dict[str, Any]:
         """Compare student response against reference solution"""
         
@@ -333,9 +596,7 @@ Provide comparison analysis in JSON format:
         
         try:
             response = self.llm.generate_response(prompt, max_tokens=800)
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            return json.loads(response[json_start:json_end])
+            return _parse_json_object(response)[0]
         except Exception as e:
             return {
                 "concept_coverage": 0.0,
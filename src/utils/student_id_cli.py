@@ -126,7 +126,7 @@ def reveal_results_file(results_file: str, id_manager: StudentIDManager, output_
     
     try:
         # Read results file
-        df = pd.read_csv(results_file)
+        df = pd.read_csv(results_file, memory_map=True)
         
         # Find student ID columns (flexible matching)
         id_columns = []